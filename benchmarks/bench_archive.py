@@ -0,0 +1,64 @@
+"""Benchmark io.archive (tar, tar.gz, tar.zst) against io.zip on a synthetic image tree.
+
+Usage:
+    python -m benchmarks.bench_archive --files 2000 --size 131072
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from waffle_utils.file import io
+
+
+def make_tree(root: Path, files: int, size: int):
+    # random bytes stand in for jpeg data, which does not compress any further
+    for i in range(files):
+        path = Path(root, "images", f"split{i % 4}", f"{i:08d}.jpg")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(os.urandom(size))
+    annotation = b'{"id": 1, "bbox": [1.0, 2.0, 3.0, 4.0]},' * (files * 10)
+    Path(root, "annotations.json").write_bytes(b"[" + annotation[:-1] + b"]")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--size", type=int, default=128 * 1024)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = Path(tmp, "src")
+        make_tree(src, args.files, args.size)
+        print(f"{args.files} images of {args.size} bytes\n")
+
+        cases = {
+            "zip": lambda dst: io.zip(src, dst),
+            "tar": lambda dst: io.archive(src, dst),
+            "tar.gz": lambda dst: io.archive(src, dst),
+        }
+        if io.zstandard is not None:
+            cases["tar.zst"] = lambda dst: io.archive(src, dst)
+        extractors = {"zip": io.unzip}
+
+        for suffix, write in cases.items():
+            dst = Path(tmp, "archive." + suffix)
+            start = time.perf_counter()
+            write(dst)
+            written = time.perf_counter() - start
+
+            out = Path(tmp, "out")
+            start = time.perf_counter()
+            extractors.get(suffix, io.extract)(dst, out, create_directory=True)
+            extracted = time.perf_counter() - start
+            print(
+                f"{suffix:<10}write {written:>7.3f}s  extract {extracted:>7.3f}s"
+                f"{os.path.getsize(dst) / 2**20:>10.1f}MiB"
+            )
+            os.remove(dst)
+            io.remove_directory(out, recursive=True)
+
+
+if __name__ == "__main__":
+    main()
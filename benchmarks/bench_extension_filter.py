@@ -0,0 +1,59 @@
+"""Micro-benchmark of file name extension filtering on a synthetic listing.
+
+Usage:
+    python -m benchmarks.bench_extension_filter --names 1000000
+"""
+import argparse
+import os
+import random
+import time
+from pathlib import Path
+
+from waffle_utils.file import search
+
+
+def make_names(n: int) -> list[str]:
+    random.seed(0)
+    extensions = [".jpg", ".JPG", ".png", ".txt", ".json", ".tar.gz", ""]
+    return [f"{i:08d}{random.choice(extensions)}" for i in range(n)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--names", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    names = make_names(args.names)
+    extension = search.SUPPORTED_IMAGE_EXTENSIONS
+    lowered = [ext.lower() for ext in extension]
+    frozen = frozenset(lowered)
+    matcher = search.ExtensionFilter(extension)
+
+    cases = {
+        "Path.suffix + list": lambda name: Path(name).suffix.lower()
+        in lowered,
+        "splitext + list": lambda name: os.path.splitext(name)[1].lower()
+        in lowered,
+        "splitext + frozenset": lambda name: os.path.splitext(name)[1].lower()
+        in frozen,
+        "ExtensionFilter": matcher,
+        "ExtensionFilter + exclude": search.ExtensionFilter(
+            extension, exclude="*_mask.*"
+        ),
+    }
+
+    print(f"{args.names} names\n")
+    expected = None
+    for name, fn in cases.items():
+        start = time.perf_counter()
+        matched = sum(map(fn, names))
+        elapsed = time.perf_counter() - start
+        expected = matched if expected is None else expected
+        assert matched == expected, name
+        print(
+            f"{name:<28}{elapsed:>8.3f}s{args.names / elapsed / 1e6:>8.2f}M names/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Benchmark io.load_json and io.save_json backends on a synthetic COCO annotation file.
+
+Usage:
+    python -m benchmarks.bench_json --images 100000 --annotations 7
+"""
+import argparse
+import importlib
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from waffle_utils.file import io
+
+
+def make_coco(images: int, annotations: int) -> dict:
+    rng = random.Random(0)
+    coco = {
+        "info": {"description": "synthetic", "version": "1.0"},
+        "categories": [
+            {"id": i, "name": f"category_{i}", "supercategory": "thing"}
+            for i in range(80)
+        ],
+        "images": [],
+        "annotations": [],
+    }
+    for image_id in range(images):
+        coco["images"].append(
+            {
+                "id": image_id,
+                "file_name": f"{image_id:012d}.jpg",
+                "width": 640,
+                "height": 480,
+            }
+        )
+        for _ in range(annotations):
+            x, y = rng.uniform(0, 600), rng.uniform(0, 440)
+            w, h = rng.uniform(1, 40), rng.uniform(1, 40)
+            coco["annotations"].append(
+                {
+                    "id": len(coco["annotations"]),
+                    "image_id": image_id,
+                    "category_id": rng.randrange(80),
+                    "bbox": [x, y, w, h],
+                    "area": w * h,
+                    "segmentation": [[x, y, x + w, y, x + w, y + h, x, y + h]],
+                    "iscrowd": 0,
+                }
+            )
+    return coco
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", type=int, default=100_000)
+    parser.add_argument("--annotations", type=int, default=7)
+    args = parser.parse_args()
+
+    coco = make_coco(args.images, args.annotations)
+    backends = []
+    for backend in io.JSON_BACKENDS:
+        try:
+            importlib.import_module(backend)
+        except ImportError:
+            continue
+        backends.append(backend)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pretty = Path(tmp, "pretty.json")
+        compact = Path(tmp, "compact.json")
+        start = time.perf_counter()
+        io.save_json(coco, pretty)
+        elapsed = time.perf_counter() - start
+        mib = os.path.getsize(pretty) / 2**20
+        print(f"{len(coco['annotations'])} annotations, {mib:.1f}MiB pretty")
+        print(
+            f"{'save pretty':<24}{elapsed:>8.3f}s{mib / elapsed:>10.1f}MiB/s\n"
+        )
+
+        for backend in backends:
+            start = time.perf_counter()
+            io.save_json(coco, compact, compact=True, backend=backend)
+            saved = time.perf_counter() - start
+            mib = os.path.getsize(compact) / 2**20
+
+            start = time.perf_counter()
+            io.load_json(compact, backend=backend)
+            loaded = time.perf_counter() - start
+            print(
+                f"{backend:<10}save compact {saved:>8.3f}s{mib / saved:>8.1f}MiB/s"
+                f"   load {loaded:>8.3f}s{mib / loaded:>8.1f}MiB/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Benchmark per-file destination path mapping used by copy, move and zip.
+
+Usage:
+    python -m benchmarks.bench_path_mapping --paths 1000000
+"""
+import argparse
+import time
+from pathlib import Path
+
+from waffle_utils.file import io
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--paths", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    src_prefix = Path("/data/datasets/coco")
+    dst = Path("/backup/datasets/coco")
+    paths = [
+        src_prefix / f"split{i % 3}" / f"seq{i % 1000}" / f"{i:012d}.jpg"
+        for i in range(args.paths)
+    ]
+    mapping = io._PathMapper(src_prefix, dst)
+
+    src_str, dst_str = str(src_prefix), str(dst)
+    cases = {
+        "str.replace + Path": lambda path: Path(
+            str(path).replace(src_str, dst_str)
+        ),
+        "Path.relative_to": lambda path: dst / path.relative_to(src_prefix),
+        "str.replace": lambda path: str(path).replace(src_str, dst_str),
+        "_PathMapper": mapping,
+    }
+
+    print(f"{args.paths} paths\n")
+    for name, fn in cases.items():
+        start = time.perf_counter()
+        for path in paths:
+            fn(path)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{name:<20}{elapsed:>8.3f}s{elapsed / args.paths * 1e9:>10.0f}ns/path"
+        )
+
+
+if __name__ == "__main__":
+    main()
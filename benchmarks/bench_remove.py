@@ -0,0 +1,53 @@
+"""Benchmark io.remove_directory serially, with threads and in the background.
+
+Usage:
+    python -m benchmarks.bench_remove --directories 200 --files 500 --workers 8
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from waffle_utils.file import io
+
+
+def make_tree(root: Path, directories: int, files: int):
+    for i in range(directories):
+        directory = Path(root, f"split{i % 4}", f"seq{i:05d}")
+        directory.mkdir(parents=True)
+        for j in range(files):
+            Path(directory, f"{j:06d}.jpg").touch()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--directories", type=int, default=200)
+    parser.add_argument("--files", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    cases = {
+        "serial": {},
+        f"workers={args.workers}": {"workers": args.workers},
+        "background": {"workers": args.workers, "background": True},
+    }
+    print(f"{args.directories * args.files} files\n")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, kwargs in cases.items():
+            root = Path(tmp, "tree")
+            make_tree(root, args.directories, args.files)
+
+            start = time.perf_counter()
+            thread = io.remove_directory(root, recursive=True, **kwargs)
+            returned = time.perf_counter() - start
+            if thread is not None:
+                thread.join()
+            finished = time.perf_counter() - start
+            print(
+                f"{name:<16}returned {returned:>8.3f}s   removed {finished:>8.3f}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
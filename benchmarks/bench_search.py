@@ -0,0 +1,84 @@
+"""Benchmark waffle_utils.file.search against the previous Path.glob implementation.
+
+Usage:
+    python -m benchmarks.bench_search --directories 200 --files 500
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from natsort import natsorted
+
+from waffle_utils.file import search
+
+
+def legacy_get_files(directory, recursive=True, extension=None):
+    files = Path(directory).glob("**/*" if recursive else "*")
+    files = list(filter(lambda file: file.is_file(), files))
+    if extension:
+        if isinstance(extension, str):
+            extension = [extension]
+        extension = [ext.lower() for ext in extension]
+        files = [
+            file
+            for file in files
+            if file.suffix.lower() in extension or file.is_dir()
+        ]
+    return natsorted(set(files))
+
+
+def make_tree(root: Path, directories: int, files: int) -> int:
+    extensions = [".jpg", ".png", ".txt", ".json"]
+    for i in range(directories):
+        directory = root / f"split{i % 4}" / f"dir{i}"
+        directory.mkdir(parents=True)
+        for j in range(files):
+            (directory / f"{j}{extensions[j % len(extensions)]}").touch()
+    return directories * files
+
+
+def timeit(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--directories", type=int, default=100)
+    parser.add_argument("--files", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        total = make_tree(root, args.directories, args.files)
+        print(f"{total} files in {args.directories} directories\n")
+
+        cases = {
+            "legacy get_files": lambda: legacy_get_files(root),
+            "get_files": lambda: search.get_files(root),
+            "get_files(sort=False)": lambda: search.get_files(
+                root, sort=False
+            ),
+            "legacy get_files(images)": lambda: legacy_get_files(
+                root, extension=search.SUPPORTED_IMAGE_EXTENSIONS
+            ),
+            "get_image_files": lambda: search.get_image_files(root),
+            "get_image_files(sort=False)": lambda: search.get_image_files(
+                root, sort=False
+            ),
+        }
+        for name, fn in cases.items():
+            elapsed = timeit(fn, args.repeat)
+            print(
+                f"{name:<32}{elapsed:>10.3f}s{total / elapsed:>14.0f} files/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
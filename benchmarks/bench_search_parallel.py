@@ -0,0 +1,79 @@
+"""Benchmark the parallel directory crawler of waffle_utils.file.search.
+
+Every os.scandir call is delayed by an artificial latency to mimic listing a
+directory on a network filesystem (NFS, CIFS).
+
+Usage:
+    python -m benchmarks.bench_search_parallel --latency 0.005 --workers 1 4 16 64
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from waffle_utils.file import search
+
+
+def make_tree(root: Path, width: int, depth: int, files: int) -> int:
+    directories = [root]
+    total = 0
+    for _ in range(depth):
+        children = []
+        for directory in directories:
+            for i in range(width):
+                child = directory / f"dir{i}"
+                child.mkdir()
+                for j in range(files):
+                    (child / f"{j}.jpg").touch()
+                total += 1
+                children.append(child)
+        directories = children
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--width", type=int, default=6)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.005)
+    parser.add_argument(
+        "--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32]
+    )
+    args = parser.parse_args()
+
+    scandir = os.scandir
+
+    def slow_scandir(path):
+        time.sleep(args.latency)
+        return scandir(path)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        directories = make_tree(root, args.width, args.depth, args.files)
+        print(
+            f"{directories} directories, {args.latency * 1000:.1f}ms per listing\n"
+        )
+
+        os.scandir = slow_scandir
+        try:
+            start = time.perf_counter()
+            expected = search.get_files(root)
+            serial = time.perf_counter() - start
+            print(f"{'serial':<16}{serial:>10.3f}s")
+
+            for workers in args.workers:
+                start = time.perf_counter()
+                files = search.get_files(root, workers=workers)
+                elapsed = time.perf_counter() - start
+                assert files == expected
+                print(
+                    f"{f'workers={workers}':<16}{elapsed:>10.3f}s{serial / elapsed:>8.1f}x"
+                )
+        finally:
+            os.scandir = scandir
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Benchmark the natural sort of waffle_utils.file.search against natsort.
+
+natsort is only needed for the baseline.
+
+Usage:
+    python -m benchmarks.bench_sort --paths 1000000
+"""
+import argparse
+import random
+import time
+
+from natsort import natsorted
+
+from waffle_utils.file import search
+
+
+def make_paths(n: int) -> list[str]:
+    random.seed(0)
+    paths = [
+        f"/data/dataset{i % 3}/split{i % 7}/seq{i % 1000}/frame{i}.jpg"
+        for i in range(n)
+    ]
+    random.shuffle(paths)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--paths", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    paths = make_paths(args.paths)
+    cases = {
+        "natsort.natsorted": natsorted,
+        "search.natural_sorted": search.natural_sorted,
+        "sorted (lexical)": sorted,
+    }
+
+    print(f"{args.paths} paths\n")
+    for name, fn in cases.items():
+        start = time.perf_counter()
+        fn(paths)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<24}{elapsed:>8.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Benchmark io.load_yaml and io.save_yaml with the libyaml and pure Python backends.
+
+Usage:
+    python -m benchmarks.bench_yaml --manifest-files 50000
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import yaml
+
+from waffle_utils.file import io
+
+
+def make_config() -> dict:
+    return {
+        "model": {
+            "name": "yolov8",
+            "backbone": {"depth": 0.33, "width": 0.25, "stages": [64, 128]},
+            "head": {"classes": 80, "anchors": [[10, 13], [16, 30]]},
+        },
+        "train": {
+            f"param_{i}": {"value": i * 0.1, "enabled": i % 2 == 0}
+            for i in range(200)
+        },
+        "augmentations": [
+            {"name": f"aug_{i}", "p": 0.5, "args": list(range(5))}
+            for i in range(100)
+        ],
+    }
+
+
+def make_manifest(files: int) -> dict:
+    return {
+        "name": "synthetic",
+        "files": [
+            {
+                "path": f"images/split{i % 4}/{i:012d}.jpg",
+                "size": 100_000 + i,
+                "label": i % 80,
+            }
+            for i in range(files)
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--manifest-files", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    backends = ["python"]
+    if yaml.__with_libyaml__:
+        backends.insert(0, "c")
+
+    cases = {
+        "config": (make_config(), args.repeat),
+        "manifest": (make_manifest(args.manifest_files), 1),
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, (obj, repeat) in cases.items():
+            fp = Path(tmp, f"{name}.yaml")
+            for backend in backends:
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    io.save_yaml(obj, fp, backend=backend)
+                saved = (time.perf_counter() - start) / repeat
+
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    io.load_yaml(fp, backend=backend)
+                loaded = (time.perf_counter() - start) / repeat
+                print(
+                    f"{name:<10}{backend:<8}{os.path.getsize(fp) / 2**20:>8.2f}MiB"
+                    f"   save {saved:>8.3f}s   load {loaded:>8.3f}s"
+                )
+
+
+if __name__ == "__main__":
+    main()
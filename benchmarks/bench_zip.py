@@ -0,0 +1,52 @@
+"""Benchmark io.zip serially and with a pool of compressing threads.
+
+Usage:
+    python -m benchmarks.bench_zip --files 2000 --size 262144 --workers 8
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from waffle_utils.file import io
+
+
+def make_tree(root: Path, files: int, size: int):
+    rng = random.Random(0)
+    words = [os.urandom(8).hex().encode() for _ in range(256)]
+    for i in range(files):
+        path = Path(root, f"split{i % 4}", f"{i:08d}.txt")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = b" ".join(rng.choices(words, k=size // 17 + 1))[:size]
+        path.write_bytes(data)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--size", type=int, default=256 * 1024)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = Path(tmp, "src")
+        make_tree(src, args.files, args.size)
+        print(f"{args.files} files of {args.size} bytes\n")
+
+        for compression in io.ZIP_COMPRESSIONS:
+            for workers in (None, args.workers):
+                dst = Path(tmp, f"{compression}.zip")
+                start = time.perf_counter()
+                io.zip(src, dst, compression=compression, workers=workers)
+                elapsed = time.perf_counter() - start
+                print(
+                    f"{compression:<10}workers={str(workers):<6}"
+                    f"{elapsed:>8.3f}s{os.path.getsize(dst) / 2**20:>10.1f}MiB"
+                )
+                os.remove(dst)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from waffle_utils.file import archive
+
+
+@pytest.fixture
+def dataset_zip(tmpdir):
+    contents = {
+        "train/1.jpg": b"jpg" * 100,
+        "train/10.jpg": b"",
+        "train/2.jpg": b"jpg2" * 100,
+        "train/sub/3.png": b"png" * 100,
+        "annotations/train.json": b'{"images": []}' * 100,
+        "video.mp4": b"mp4" * 100,
+    }
+    fp = Path(tmpdir, "dataset.zip")
+    with zipfile.ZipFile(fp, "w") as f:
+        f.writestr("empty/", b"")
+        for name, data in contents.items():
+            compress_type = (
+                zipfile.ZIP_DEFLATED
+                if name.endswith(".json")
+                else zipfile.ZIP_STORED
+            )
+            f.writestr(name, data, compress_type=compress_type)
+        f.writestr("lzma.txt", b"lzma" * 100, zipfile.ZIP_LZMA)
+    contents["lzma.txt"] = b"lzma" * 100
+    return fp, contents
+
+
+@pytest.mark.parametrize(
+    "compress_type", [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED]
+)
+def test_zip_dataset_crc(tmpdir, compress_type):
+    fp = Path(tmpdir, "corrupt.zip")
+    with zipfile.ZipFile(fp, "w") as f:
+        # level 0 deflate keeps the data as is, so it can be corrupted in place
+        f.writestr("data.bin", b"data" * 100, compress_type, compresslevel=0)
+    raw = fp.read_bytes()
+    offset = raw.index(b"data" * 100)
+    fp.write_bytes(raw[:offset] + b"x" + raw[offset + 1 :])
+
+    with archive.ZipDataset(fp) as dataset:
+        with pytest.raises(zipfile.BadZipFile):
+            dataset.read("data.bin")
+
+
+def test_zip_dataset_read(dataset_zip):
+    fp, contents = dataset_zip
+    with archive.ZipDataset(fp) as dataset:
+        assert len(dataset) == len(contents)
+        assert "train/1.jpg" in dataset
+        assert "empty/" not in dataset
+        for name, data in contents.items():
+            assert dataset.read(name) == data
+            with dataset.open(name) as f:
+                assert f.read() == data
+
+        view = dataset.view("train/2.jpg")
+        assert view == contents["train/2.jpg"]
+        view.release()
+        with pytest.raises(ValueError):
+            dataset.view("annotations/train.json")
+        with pytest.raises(KeyError):
+            dataset.read("missing.jpg")
+
+        names = list(contents) * 10
+        with ThreadPoolExecutor(4) as executor:
+            for name, data in zip(names, executor.map(dataset.read, names)):
+                assert data == contents[name]
+
+    # the zipfile handle is opened once, even by concurrent readers
+    with archive.ZipDataset(fp) as dataset:
+        with ThreadPoolExecutor(4) as executor:
+            handles = set(
+                map(
+                    id,
+                    executor.map(lambda _: dataset._open_zipfile(), range(8)),
+                )
+            )
+        assert len(handles) == 1
+
+    with pytest.raises(TypeError):
+        archive._MemberListing()
+
+    # the index is parsed once per version of the archive
+    with archive.ZipDataset(fp) as first, archive.ZipDataset(fp) as second:
+        assert first._index is second._index
+
+
+def test_zip_dataset_get_files(dataset_zip):
+    fp, _ = dataset_zip
+    with archive.ZipDataset(fp) as dataset:
+        assert dataset.get_files("train", recursive=False) == [
+            "train/1.jpg",
+            "train/2.jpg",
+            "train/10.jpg",
+        ]
+        assert dataset.get_image_files("train/") == [
+            "train/1.jpg",
+            "train/2.jpg",
+            "train/10.jpg",
+            "train/sub/3.png",
+        ]
+        assert dataset.get_files(extension=".json") == [
+            "annotations/train.json"
+        ]
+        assert dataset.get_video_files() == ["video.mp4"]
+        assert dataset.get_files("train", sort="size")[0] == "train/10.jpg"
+
+
+def test_write_zip_shards(dummy_directory, tmpdir):
+    names = sorted(map(str, dummy_directory["file_relative_path_list"]))
+    dst = Path(tmpdir, "shards")
+
+    with pytest.raises(ValueError):
+        archive.write_zip_shards(dummy_directory["path"], dst)
+
+    manifest = archive.write_zip_shards(
+        dummy_directory["path"],
+        dst,
+        shard_files=2,
+        create_directory=True,
+        workers=2,
+    )
+    shards = sorted(dst.glob("shard-*.zip"))
+    assert len(shards) == (len(names) + 1) // 2
+
+    with archive.ShardedZipDataset(manifest) as dataset:
+        assert sorted(dataset) == names
+        assert sorted(dataset.get_files()) == names
+        for name in names:
+            assert (
+                dataset.read(name)
+                == Path(dummy_directory["path"], name).read_bytes()
+            )
+        with pytest.raises(KeyError):
+            dataset.read("missing.jpg")
+
+    # a member only opens its own shard
+    with archive.ShardedZipDataset(dst) as dataset:
+        dataset.read(names[0])
+        assert sum(shard is not None for shard in dataset._datasets) == 1
+
+
+def test_write_zip_shards_size(tmpdir):
+    src = Path(tmpdir, "src")
+    src.mkdir()
+    for i in range(10):
+        Path(src, f"{i}.bin").write_bytes(bytes(100))
+    dst = Path(tmpdir, "shards")
+    archive.write_zip_shards(src, dst, shard_size=250, create_directory=True)
+
+    for shard in dst.glob("shard-*.zip"):
+        with zipfile.ZipFile(shard) as f:
+            assert sum(info.file_size for info in f.infolist()) <= 250
+    with archive.ShardedZipDataset(dst) as dataset:
+        assert len(dataset.shards) == 5
+        assert dataset.get_files() == [f"{i}.bin" for i in range(10)]
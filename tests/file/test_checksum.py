@@ -0,0 +1,80 @@
+import hashlib
+from pathlib import Path
+
+import pytest
+
+from waffle_utils.file import checksum
+
+
+@pytest.fixture
+def duplicated_directory(tmpdir):
+    directory = Path(tmpdir, "dataset")
+    files = {
+        "a/1.jpg": b"same",
+        "b/2.jpg": b"same",
+        "b/10.jpg": b"same",
+        "c/3.jpg": b"diff",
+        "c/4.txt": b"other content",
+        "d/5.txt": b"another text!",
+        "empty1.txt": b"",
+        "empty2.txt": b"",
+    }
+    for name, data in files.items():
+        Path(directory, name).parent.mkdir(parents=True, exist_ok=True)
+        Path(directory, name).write_bytes(data)
+    return directory
+
+
+@pytest.mark.parametrize("workers", [None, 4])
+def test_hash_files(duplicated_directory, monkeypatch, workers):
+    paths = sorted(duplicated_directory.rglob("*.*"))
+    hashes = checksum.hash_files(paths, workers=workers)
+    assert list(hashes) == paths
+    for path in paths:
+        assert hashes[path] == hashlib.blake2b(path.read_bytes()).hexdigest()
+
+    # large files are hashed from a memory map
+    monkeypatch.setattr(checksum, "_MMAP_THRESHOLD", 4)
+    monkeypatch.setattr(checksum, "_CHUNK_SIZE", 3)
+    assert checksum.hash_files(paths, algo="blake2b") == hashes
+    assert checksum.hash_file(paths[0], "sha256") == (
+        hashlib.sha256(paths[0].read_bytes()).hexdigest()
+    )
+
+    with pytest.raises(ValueError):
+        checksum.hash_files(paths, algo="crc")
+
+
+def test_hash_files_cache(duplicated_directory, tmpdir, monkeypatch):
+    paths = sorted(duplicated_directory.rglob("*.*"))
+    cache_path = Path(tmpdir, "hash.sqlite")
+    hashes = checksum.hash_files(paths, cache=cache_path)
+
+    hashed = []
+    hash_file = checksum.hash_file
+    monkeypatch.setattr(
+        checksum,
+        "hash_file",
+        lambda path, algo: hashed.append(path) or hash_file(path, algo),
+    )
+    with checksum.HashCache(cache_path) as cache:
+        assert checksum.hash_files(paths, cache=cache) == hashes
+        assert hashed == []
+
+        paths[0].write_bytes(b"changed content")
+        hashes = checksum.hash_files(paths, cache=cache)
+        assert hashed == [paths[0]]
+        assert (
+            hashes[paths[0]] == hashlib.blake2b(b"changed content").hexdigest()
+        )
+
+
+def test_find_duplicates(duplicated_directory):
+    root = duplicated_directory
+    assert checksum.find_duplicates(root, workers=2) == [
+        [Path(root, "a/1.jpg"), Path(root, "b/2.jpg"), Path(root, "b/10.jpg")],
+        [Path(root, "empty1.txt"), Path(root, "empty2.txt")],
+    ]
+    assert checksum.find_duplicates(root, extension=".txt") == [
+        [Path(root, "empty1.txt"), Path(root, "empty2.txt")],
+    ]
@@ -1,10 +1,17 @@
+import json
+import os
+import pickle
 import shutil
+import threading
 import zipfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from random import Random
 
 import pytest
+import yaml
 
-from waffle_utils.file import io
+from waffle_utils.file import checksum, io, search
 
 
 def test_save_json(dummy_json, tmpdir):
@@ -26,6 +33,170 @@ def test_load_json(
     assert io.load_json(fp) == data
 
 
+@pytest.mark.parametrize("backend", io.JSON_BACKENDS)
+def test_json_backend(tmpdir, backend):
+    pytest.importorskip(backend)
+    data = {
+        "images": [{"id": i, "file_name": f"{i}.jpg"} for i in range(10)],
+        "categories": [{"id": 1, "name": "사람"}],
+        "score": 0.5,
+    }
+
+    fp = Path(tmpdir, "compact.json")
+    io.save_json(data, fp, compact=True, backend=backend)
+    assert b"\n" not in fp.read_bytes()
+    assert io.load_json(fp, backend=backend) == data
+
+    fp = Path(tmpdir, "pretty.json")
+    io.save_json(data, fp, backend=backend)
+    assert fp.read_text().startswith('{\n    "images"')
+    assert io.load_json(fp, backend=backend) == data
+
+    # what only the standard library handles
+    data = {"nan": float("nan"), "big": 2**70, 1: "int key"}
+    io.save_json(data, fp, compact=True, backend=backend)
+    loaded = io.load_json(fp, backend=backend)
+    assert loaded["big"] == 2**70 and loaded["1"] == "int key"
+
+
+@pytest.fixture
+def cp1252_locale(monkeypatch):
+    """Open text files as cp1252 unless an encoding is given, as on Windows."""
+    builtin_open = open
+
+    def open_cp1252(file, mode="r", *args, **kwargs):
+        if "b" not in mode and not args:
+            kwargs.setdefault("encoding", "cp1252")
+        return builtin_open(file, mode, *args, **kwargs)
+
+    monkeypatch.setattr("builtins.open", open_cp1252)
+
+
+def test_json_utf8(tmpdir, cp1252_locale):
+    data = {"categories": [{"id": 1, "name": "사람"}]}
+    fp = Path(tmpdir, "utf8.json")
+    io.save_json(data, fp)
+    assert io.load_json(fp, backend="json") == data
+
+    io.save_json_stream({"categories": iter(data["categories"])}, fp)
+    assert io.load_json(fp) == data
+    assert list(io.iter_json(fp, "categories.item", backend="json")) == (
+        data["categories"]
+    )
+
+
+def test_json_backend_unknown(tmpdir, monkeypatch):
+    with pytest.raises(ValueError):
+        io.load_json(Path(tmpdir), backend="rapidjson")
+    monkeypatch.setattr(io, "orjson", None)
+    with pytest.raises(ImportError):
+        io.save_json(
+            {}, Path(tmpdir, "a.json"), compact=True, backend="orjson"
+        )
+
+
+@pytest.mark.parametrize("backend", ["json", "ijson"])
+def test_iter_json(tmpdir, monkeypatch, backend):
+    if backend == "ijson":
+        pytest.importorskip("ijson")
+    data = {
+        "info": {"version": [1, 2.5e-3, {"note": 'a "quoted" ]'}]},
+        "images": [{"id": i, "file_name": f"{i}.jpg"} for i in range(100)],
+        "annotations": [
+            {"id": i, "bbox": [i + 0.5, 1e3, -3, 123456789012]}
+            for i in range(300)
+        ],
+        "empty": [],
+    }
+    fp = Path(tmpdir, "coco.json")
+    io.save_json(data, fp)
+    # values cut by the end of the read buffer
+    monkeypatch.setattr(io, "_JSON_CHUNK_SIZE", 7)
+
+    assert (
+        list(io.iter_json(fp, "annotations.item", backend))
+        == data["annotations"]
+    )
+    assert list(io.iter_json(fp, "images.item.id", backend)) == list(
+        range(100)
+    )
+    assert list(io.iter_json(fp, "info.version.item.note", backend)) == [
+        'a "quoted" ]'
+    ]
+    assert list(io.iter_json(fp, "empty.item", backend)) == []
+    assert list(io.iter_json(fp, "missing.item", backend)) == []
+
+    fp = Path(tmpdir, "list.json")
+    io.save_json(data["images"], fp, compact=True)
+    assert list(io.iter_json(fp, backend=backend)) == data["images"]
+
+
+def test_save_json_stream(tmpdir):
+    images = [{"id": i, "file_name": f"{i}.jpg"} for i in range(10)]
+    fp = Path(tmpdir, "stream.json")
+    io.save_json_stream(
+        {
+            "images": images,
+            "annotations": ({"id": i} for i in range(5)),
+            "categories": iter([]),
+        },
+        fp,
+    )
+    assert io.load_json(fp) == {
+        "images": images,
+        "annotations": [{"id": i} for i in range(5)],
+        "categories": [],
+    }
+
+    fp = Path(tmpdir, "sub", "list.json")
+    io.save_json_stream(range(3), fp, create_directory=True)
+    assert io.load_json(fp) == [0, 1, 2]
+    assert list(io.iter_json(fp)) == [0, 1, 2]
+
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_jsonl(tmpdir, monkeypatch, workers):
+    records = [{"id": i, "name": f"이름 {i}\n"} for i in range(200)]
+    fp = Path(tmpdir, "sub", "records.jsonl")
+    io.save_jsonl(iter(records), fp, create_directory=True)
+    assert len(fp.read_bytes().splitlines()) == len(records)
+
+    # many small byte ranges
+    monkeypatch.setattr(io, "_JSON_CHUNK_SIZE", 100)
+    monkeypatch.setattr(io, "_JSONL_CHUNK_SIZE", 100)
+    assert io.load_jsonl(fp, workers=workers) == records
+    assert list(io.iter_jsonl(fp, workers=workers)) == records
+
+    with pytest.raises(FileNotFoundError):
+        io.load_jsonl(Path(tmpdir, "missing.jsonl"))
+
+
+def test_append_jsonl(tmpdir):
+    fp = Path(tmpdir, "log", "records.jsonl")
+    io.append_jsonl([{"id": -1}], fp, create_directory=True)
+
+    # concurrent writers never interleave their lines
+    with ProcessPoolExecutor(4) as executor:
+        futures = [
+            executor.submit(
+                io.append_jsonl,
+                [{"writer": w, "id": i, "pad": "x" * 5000} for i in range(50)],
+                fp,
+            )
+            for w in range(4)
+        ]
+        for future in futures:
+            future.result()
+
+    records = io.load_jsonl(fp)
+    assert len(records) == 201
+    assert records[0] == {"id": -1}
+    for w in range(4):
+        assert [r["id"] for r in records if r.get("writer") == w] == list(
+            range(50)
+        )
+
+
 def test_save_yaml(dummy_yaml, tmpdir):
     data = dummy_yaml["data"]
     fp = Path(tmpdir, "test.yaml")
@@ -45,6 +216,234 @@ def test_load_yaml(
     assert io.load_yaml(fp) == data
 
 
+@pytest.mark.parametrize("backend", io.YAML_BACKENDS)
+def test_yaml_backend(tmpdir, backend):
+    if backend == "c" and not yaml.__with_libyaml__:
+        pytest.skip("PyYAML is built without libyaml")
+    data = {"model": {"name": "yolo", "sizes": [640, 1280]}, "lr": 0.01}
+
+    fp = Path(tmpdir, f"{backend}.yaml")
+    io.save_yaml(data, fp, backend=backend)
+    assert io.load_yaml(fp, backend=backend) == data
+    # both backends write the same text
+    assert fp.read_text() == yaml.safe_dump(data, indent=4, sort_keys=False)
+
+    with pytest.raises(ValueError):
+        io.load_yaml(fp, backend="ruamel")
+
+
+def test_yaml_backend_without_libyaml(tmpdir, monkeypatch):
+    monkeypatch.setattr(yaml, "__with_libyaml__", False)
+    fp = Path(tmpdir, "a.yaml")
+    io.save_yaml({"a": 1}, fp)
+    assert io.load_yaml(fp) == {"a": 1}
+    with pytest.raises(ImportError):
+        io.load_yaml(fp, backend="c")
+
+
+def test_atomic_save(tmpdir, monkeypatch):
+    fp = Path(tmpdir, "meta.json")
+    io.save_json({"step": 1}, fp, fsync=True)
+    io.save_yaml({"step": 1}, Path(tmpdir, "meta.yaml"), fsync=True)
+
+    # pretty files are streamed with the same layout as json.dumps
+    data = {"name": "사람", "values": [1, 2]}
+    io.save_json(data, Path(tmpdir, "pretty.json"))
+    assert (
+        Path(tmpdir, "pretty.json").read_bytes()
+        == json.dumps(data, ensure_ascii=False, indent=4).encode()
+    )
+    os.remove(Path(tmpdir, "pretty.json"))
+
+    # a failed save leaves the previous file and no temporary file behind
+    with pytest.raises(TypeError):
+        io.save_json({"step": object()}, fp)
+    with pytest.raises(TypeError):
+        io.save_jsonl([{"step": 2}, {"step": object()}], fp, backend="json")
+    assert io.load_json(fp) == {"step": 1}
+    assert sorted(os.listdir(tmpdir)) == ["meta.json", "meta.yaml"]
+
+    # a symbolic link is written through, not replaced
+    target = Path(tmpdir, "configs", "exp1.yaml")
+    io.save_yaml({"a": 1}, target, create_directory=True)
+    link = Path(tmpdir, "configs", "config.yaml")
+    link.symlink_to(target)
+    io.save_yaml({"a": 2}, link)
+    assert link.is_symlink() and io.load_yaml(target) == {"a": 2}
+    with io.BatchWriter() as writer:
+        writer.save_yaml({"a": 3}, link)
+    assert link.is_symlink() and io.load_yaml(target) == {"a": 3}
+    shutil.rmtree(target.parent)
+
+    # a replaced file keeps its permission bits
+    if os.name != "nt":
+        os.chmod(fp, 0o600)
+        io.save_json({"step": 1}, fp)
+        with io.BatchWriter() as writer:
+            writer.save_json({"step": 1}, fp)
+        assert os.stat(fp).st_mode & 0o777 == 0o600
+
+    # on Windows, a rename blocked by an open reader is retried
+    replace = os.replace
+    failures = [PermissionError(13, "in use")] * 2
+
+    def busy_replace(src, dst):
+        if failures:
+            raise failures.pop()
+        replace(src, dst)
+
+    monkeypatch.setattr(io, "_RETRY_REPLACE", True)
+    monkeypatch.setattr(io.os, "replace", busy_replace)
+    io.save_json({"step": 1}, fp)
+    assert not failures and io.load_json(fp) == {"step": 1}
+    monkeypatch.setattr(io, "_REPLACE_TIMEOUT", 0)
+    failures.append(PermissionError(13, "in use"))
+    with pytest.raises(PermissionError):
+        io.save_json({"step": 1}, fp)
+    monkeypatch.undo()
+    assert sorted(os.listdir(tmpdir)) == ["meta.json", "meta.yaml"]
+
+    # readers polling the file never see it half-written
+    data = {"values": list(range(100_000))}
+    stop = threading.Event()
+
+    def write():
+        while not stop.is_set():
+            io.save_json(data, fp)
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    try:
+        for _ in range(20):
+            assert io.load_json(fp, backend="json") in ({"step": 1}, data)
+    finally:
+        stop.set()
+        writer.join()
+
+
+def test_batch_writer(tmpdir):
+    with io.BatchWriter(fsync=True) as writer:
+        for step in range(3):
+            writer.save_json({"step": step}, Path(tmpdir, "latest.json"))
+            writer.save_yaml(
+                {"step": step},
+                Path(tmpdir, "steps", f"{step}.yaml"),
+                create_directory=True,
+            )
+        assert len(writer) == 4
+        assert not Path(tmpdir, "latest.json").exists()
+    assert io.load_json(Path(tmpdir, "latest.json")) == {"step": 2}
+    assert io.load_yaml(Path(tmpdir, "steps", "1.yaml")) == {"step": 1}
+
+    writer = io.BatchWriter(max_pending=2)
+    writer.save_json({}, Path(tmpdir, "a.json"))
+    assert len(writer) == 1
+    writer.save_json({}, Path(tmpdir, "b.json"))
+    assert len(writer) == 0 and Path(tmpdir, "b.json").exists()
+
+
+def test_cached_load(tmpdir):
+    io.clear_cached_load()
+    fp = Path(tmpdir, "config.yaml")
+    io.save_yaml({"classes": ["cat", "dog"], "size": 640}, fp)
+
+    config = io.cached_load(fp)
+    config["classes"].append("bird")
+    assert io.cached_load(fp) == {"classes": ["cat", "dog"], "size": 640}
+    info = io.cached_load_info()
+    assert (info.hits, info.misses, info.size) == (1, 1, 1)
+
+    frozen = io.cached_load(fp, readonly=True)
+    assert frozen is io.cached_load(fp, readonly=True)
+    with pytest.raises(TypeError):
+        frozen["size"] = 320
+    with pytest.raises(TypeError):
+        frozen["classes"].append("bird")
+    # read-only views can be saved as they are
+    io.save_json(frozen, Path(tmpdir, "config.json"))
+    io.save_yaml(frozen, Path(tmpdir, "copy.yaml"))
+    assert io.cached_load(Path(tmpdir, "copy.yaml")) == frozen
+    # and sent to worker processes
+    unpickled = pickle.loads(pickle.dumps(frozen))
+    assert unpickled == frozen
+    assert isinstance(unpickled["classes"], io.FrozenList)
+    with pytest.raises(TypeError):
+        unpickled["classes"].append("bird")
+
+    # a changed file is parsed again and replaces the old version
+    io.save_yaml({"classes": ["person"]}, fp)
+    os.utime(fp, ns=(0, 0))
+    assert io.cached_load(fp) == {"classes": ["person"]}
+    assert io.cached_load_info().size == 2
+
+    text = Path(tmpdir, "config.txt")
+    text.touch()
+    with pytest.raises(ValueError):
+        io.cached_load(text)
+
+    io.clear_cached_load()
+    assert io.cached_load_info() == io.CacheInfo(
+        maxsize=io.CACHED_LOAD_MAXSIZE
+    )
+
+
+@pytest.mark.parametrize("workers", [None, 4])
+def test_manifest(dummy_directory, tmpdir, monkeypatch, workers):
+    src = Path(tmpdir, "src")
+    shutil.copytree(dummy_directory["path"], src)
+    manifest = io.write_manifest(src, algo="blake2b", workers=workers)
+    assert Path(manifest) == Path(src, "manifest.jsonl")
+    assert len(io.load_jsonl(manifest)) == dummy_directory["file_num"] + 1
+
+    dst = Path(tmpdir, "dst")
+    io.copy_files_to_directory(src, dst, create_directory=True)
+    assert io.verify_manifest(dst, workers=workers).ok
+    # copies do not preserve mtimes
+    assert not io.verify_manifest(dst, check_mtime=True).ok
+
+    files = sorted(
+        str(path.relative_to(dummy_directory["path"])).replace(os.sep, "/")
+        for path in dummy_directory["file_list"]
+    )
+    Path(dst, files[0]).unlink()
+    Path(dst, files[1]).write_text("truncated")
+    # same size, other content: only hashes tell
+    data = Path(dst, files[2]).read_bytes()
+    Path(dst, files[2]).write_bytes(bytes(len(data)))
+    Path(dst, "new.txt").write_text("new")
+
+    report = io.verify_manifest(dst, manifest=manifest, workers=workers)
+    assert report.missing == [files[0]]
+    assert report.extra == ["new.txt"]
+    assert report.changed == sorted(files[1:3])
+    report = io.verify_manifest(dst, manifest=manifest, check_hash=False)
+    assert report.changed == [files[1]]
+
+    with pytest.raises(ValueError):
+        io.verify_manifest(dst, manifest=Path(dst, "new.txt"))
+
+    # files whose size and mtime match are not hashed again
+    hashed = []
+    checksum_hash_files = checksum.hash_files
+
+    def hash_files(paths, **kwargs):
+        hashed.extend(paths)
+        return checksum_hash_files(paths, **kwargs)
+
+    monkeypatch.setattr(io.checksum, "hash_files", hash_files)
+    assert io.verify_manifest(src, workers=workers).ok
+    assert not hashed
+
+    path = Path(src, files[2])
+    stat = path.stat()
+    path.write_bytes(bytes(stat.st_size))
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert io.verify_manifest(src, workers=workers).ok
+    report = io.verify_manifest(src, rehash=True, workers=workers)
+    assert report.changed == [files[2]]
+    assert len(hashed) == dummy_directory["file_num"]
+
+
 def test_copy_files_to_directory(
     dummy_directory, dummy_directory_clone, tmpdir
 ):
@@ -132,6 +531,194 @@ def test_copy_files_to_directory(
     )
 
 
+def test_copy_files_to_directory_parallel(dummy_directory, tmpdir):
+    src = dummy_directory["path"]
+    Path(src, "sub", "large.bin").write_bytes(os.urandom(1024 * 1024))
+
+    dst = Path(tmpdir, "serial")
+    serial = io.copy_files_to_directory(src, dst, create_directory=True)
+
+    dst = Path(tmpdir, "parallel")
+    result = io.copy_files_to_directory(
+        src, dst, create_directory=True, workers=4
+    )
+    assert result.files == serial.files == dummy_directory["file_num"] + 1
+    assert result.bytes == serial.bytes
+    assert not result.failures
+    assert result.files_per_second > 0
+    for file in search.get_files(src):
+        dst_file = Path(dst, file.relative_to(src))
+        assert dst_file.read_bytes() == file.read_bytes()
+
+    # failures are raised unless ignored
+    Path(dst, "sub", "large.bin").unlink()
+    Path(dst, "sub", "large.bin").mkdir()
+    with pytest.raises(OSError):
+        io.copy_files_to_directory(src, dst, workers=4)
+    result = io.copy_files_to_directory(
+        src, dst, workers=4, ignore_errors=True
+    )
+    assert result.files == dummy_directory["file_num"]
+    assert [src_file for src_file, _ in result.failures] == [
+        Path(src, "sub", "large.bin")
+    ]
+
+
+def test_copy_files_to_directory_update(dummy_directory, tmpdir):
+    src = dummy_directory["path"]
+    dst = Path(tmpdir, "dst")
+
+    # dry run touches nothing
+    result = io.copy_files_to_directory(
+        src, dst, create_directory=True, dry_run=True
+    )
+    assert not dst.exists()
+    assert result.files == dummy_directory["file_num"]
+    assert sorted(src_file for src_file, _ in result.planned) == sorted(
+        dummy_directory["file_list"]
+    )
+
+    result = io.copy_files_to_directory(
+        src, dst, create_directory=True, update=True
+    )
+    assert result.files == dummy_directory["file_num"]
+
+    # nothing changed
+    result = io.copy_files_to_directory(src, dst, update=True, workers=4)
+    assert result.files == 0
+    assert result.skipped == dummy_directory["file_num"]
+
+    # only the changed file is copied
+    changed = dummy_directory["file_list"][0]
+    changed.write_text("changed")
+    result = io.copy_files_to_directory(src, dst, update=True, dry_run=True)
+    assert result.planned == [(changed, Path(dst, changed.name))]
+    result = io.copy_files_to_directory(src, dst, update=True)
+    assert result.files == 1
+    assert Path(dst, changed.name).read_text() == "changed"
+
+    # same size and mtime but different contents
+    dst_file = Path(dst, changed.name)
+    dst_file.write_text("CHANGED")
+    shutil.copystat(changed, dst_file)
+    result = io.copy_files_to_directory(src, dst, update=True)
+    assert result.files == 0
+    result = io.copy_files_to_directory(src, dst, update=True, verify=True)
+    assert result.files == 1
+    assert dst_file.read_text() == "changed"
+
+
+@pytest.mark.parametrize(
+    "strategy", ["copy", "hardlink", "symlink", "reflink", "auto"]
+)
+def test_copy_files_to_directory_strategy(dummy_directory, tmpdir, strategy):
+    src = dummy_directory["path"]
+    dst = Path(tmpdir, strategy)
+
+    try:
+        result = io.copy_files_to_directory(
+            src, dst, create_directory=True, strategy=strategy
+        )
+    except OSError:
+        assert strategy == "reflink"
+        pytest.skip("reflink is not supported on this filesystem")
+    assert result.files == dummy_directory["file_num"]
+
+    for file in dummy_directory["file_list"]:
+        dst_file = Path(dst, file.relative_to(src))
+        assert dst_file.read_bytes() == file.read_bytes()
+        assert dst_file.is_symlink() == (strategy == "symlink")
+        if strategy == "hardlink":
+            assert dst_file.samefile(file)
+        if strategy in ["copy", "reflink"]:
+            assert not dst_file.samefile(file)
+
+    # existing files are replaced
+    result = io.copy_files_to_directory(src, dst, strategy=strategy)
+    assert result.files == dummy_directory["file_num"]
+
+    with pytest.raises(ValueError):
+        io.copy_files_to_directory(src, dst, strategy="teleport")
+
+
+def test_copy_files_to_nested_directory(dummy_directory):
+    src = dummy_directory["path"]
+    dst = Path(src, "backup")
+
+    io.copy_files_to_directory(src, dst, create_directory=True)
+    assert dummy_directory["file_num"] == len(
+        list(filter(lambda x: x.is_file(), dst.glob("**/*")))
+    )
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_path_mapper(seed):
+    random = Random(seed)
+    names = ["a", "b", "data", "data2", "1", "a.b", "sub"]
+
+    def random_path(depth):
+        return os.path.join(
+            os.sep, *(random.choice(names) for _ in range(depth))
+        )
+
+    src_prefix = random_path(random.randint(0, 3))
+    dst = random_path(random.randint(0, 3))
+    mapping = io._PathMapper(src_prefix, dst)
+
+    for _ in range(100):
+        # paths that repeat the prefix or share its spelling must map too
+        relative = os.path.join(
+            *(
+                random.choice(names + [src_prefix.strip(os.sep) or "a"])
+                for _ in range(random.randint(1, 4))
+            )
+        )
+        path = Path(src_prefix, relative)
+        assert Path(mapping(path)) == Path(dst, path.relative_to(src_prefix))
+        assert mapping.relative(path) == str(path.relative_to(src_prefix))
+
+        outside = Path(random_path(random.randint(1, 4)))
+        try:
+            expected = outside.relative_to(src_prefix)
+        except ValueError:
+            with pytest.raises(ValueError):
+                mapping(outside)
+        else:
+            assert Path(mapping(outside)) == Path(dst, expected)
+
+
+def test_copy_files_to_directory_repeated_prefix(tmpdir):
+    src = Path(tmpdir, "data")
+    file = Path(src, "sub", "data", "x.txt")
+    file.parent.mkdir(parents=True)
+    file.write_text("x")
+
+    dst = Path(tmpdir, "out")
+    io.copy_files_to_directory(src, dst, create_directory=True)
+    assert Path(dst, "sub", "data", "x.txt").read_text() == "x"
+
+    io.move_files_to_directory(
+        src, Path(tmpdir, "moved"), create_directory=True
+    )
+    assert Path(tmpdir, "moved", "sub", "data", "x.txt").read_text() == "x"
+
+
+def test_copy_to_same_file(dummy_directory, dummy_text):
+    src = dummy_text["path"]
+    for strategy in io.COPY_STRATEGIES:
+        with pytest.raises(shutil.SameFileError):
+            io.copy_file(src, src, strategy=strategy)
+        assert Path(src).read_text() == dummy_text["data"]
+
+    files = {file: file.read_bytes() for file in dummy_directory["file_list"]}
+    with pytest.raises(shutil.SameFileError):
+        io.copy_files_to_directory(
+            dummy_directory["path"], dummy_directory["path"]
+        )
+    for file, data in files.items():
+        assert file.read_bytes() == data
+
+
 def test_copy_file(dummy_text, tmpdir):
     src = dummy_text["path"]
     dst = Path(tmpdir, "test.txt")
@@ -143,6 +730,20 @@ def test_copy_file(dummy_text, tmpdir):
     io.copy_file(src, dst, create_directory=True)
     assert dst.exists()
 
+    dst = Path(tmpdir, "link.txt")
+    io.copy_file(src, dst, strategy="hardlink")
+    assert dst.samefile(src)
+
+    dst = Path(tmpdir, "auto.txt")
+    io.copy_file(src, dst, strategy="auto")
+    assert dst.read_text() == dummy_text["data"]
+
+    # copying over a link replaces the link instead of writing through it
+    other = Path(tmpdir, "other.txt")
+    other.write_text("other")
+    io.copy_file(other, Path(tmpdir, "link.txt"))
+    assert Path(src).read_text() == dummy_text["data"]
+
 
 def test_move_files(dummy_directory, tmpdir):
     def dummy_factory(dst):
@@ -294,6 +895,40 @@ def test_move_files(dummy_directory, tmpdir):
     )
 
 
+def test_move_files_update(dummy_directory, tmpdir):
+    src = Path(tmpdir, "src")
+    shutil.copytree(dummy_directory["path"], src)
+    dst = Path(tmpdir, "dst")
+    io.copy_files_to_directory(src, dst, create_directory=True, update=True)
+    Path(src, "new.txt").write_text("new")
+
+    result = io.move_files_to_directory(src, dst, update=True, dry_run=True)
+    assert result.planned == [(Path(src, "new.txt"), Path(dst, "new.txt"))]
+    assert Path(src, "new.txt").exists()
+
+    result = io.move_files_to_directory(src, dst, update=True)
+    assert result.files == 1
+    assert result.skipped == dummy_directory["file_num"]
+    assert not search.get_files(src)
+    assert len(search.get_files(dst)) == dummy_directory["file_num"] + 1
+
+    # a newer destination of the same size is kept, and so is its source
+    Path(src, "1.txt").write_text("1.txt")
+    Path(dst, "1.txt").write_text("zzzzz")
+    stat = Path(src, "1.txt").stat()
+    os.utime(Path(dst, "1.txt"), ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    result = io.move_files_to_directory(src, dst, update=True)
+    assert result.skipped == 1 and result.files == 0
+    assert Path(src, "1.txt").read_text() == "1.txt"
+    assert Path(dst, "1.txt").read_text() == "zzzzz"
+
+    # contents tell the files apart, so the source is moved
+    result = io.move_files_to_directory(src, dst, update=True, verify=True)
+    assert result.files == 1
+    assert not Path(src, "1.txt").exists()
+    assert Path(dst, "1.txt").read_text() == "1.txt"
+
+
 def test_make_directory(tmpdir):
     directory = Path(tmpdir, "test")
     io.make_directory(directory)
@@ -327,6 +962,44 @@ def test_remove_directory(tmpdir):
     io.remove_directory(directory, recursive=True)
     assert not directory.exists()
 
+    directory.mkdir()
+    io.remove_directory(directory)
+    assert not directory.exists()
+
+
+@pytest.mark.parametrize("workers", [None, 4])
+def test_remove_directory_tree(dummy_directory, tmpdir, workers):
+    directory = Path(tmpdir, "tree")
+    shutil.copytree(dummy_directory["path"], directory)
+    # links are removed, never followed
+    outside = Path(tmpdir, "outside")
+    outside.mkdir()
+    Path(outside, "keep.txt").touch()
+    Path(directory, "link").symlink_to(outside)
+
+    io.remove_directory(directory, recursive=True, workers=workers)
+    assert not directory.exists()
+    assert Path(outside, "keep.txt").exists()
+
+    shutil.copytree(dummy_directory["path"], directory)
+    thread = io.remove_directory(
+        directory, recursive=True, workers=workers, background=True
+    )
+    assert not directory.exists()
+    thread.join()
+    assert os.listdir(tmpdir) == ["outside"]
+
+    # a link to a directory is refused, as shutil.rmtree does
+    link = Path(tmpdir, "link")
+    link.symlink_to(outside)
+    for background in (False, True):
+        with pytest.raises(OSError):
+            io.remove_directory(
+                link, recursive=True, workers=workers, background=background
+            )
+        assert link.is_symlink()
+        assert Path(outside, "keep.txt").exists()
+
 
 def test_zip(dummy_directory, dummy_directory_clone, tmpdir):
     # test zip directory
@@ -381,9 +1054,232 @@ def test_zip(dummy_directory, dummy_directory_clone, tmpdir):
         ).exists(), file
 
 
+@pytest.mark.parametrize("compression", list(io.ZIP_COMPRESSIONS))
+def test_zip_parallel(tmpdir, monkeypatch, compression):
+    src = Path(tmpdir, "src")
+    rng = Random(0)
+    contents = {}
+    for i in range(20):
+        name = f"{i % 3}/file_{i}.{'jpg' if i % 4 == 0 else 'txt'}"
+        contents[name] = bytes(rng.choices(b"abc", k=rng.randint(0, 5000)))
+        Path(src, name).parent.mkdir(parents=True, exist_ok=True)
+        Path(src, name).write_bytes(contents[name])
+    # members above the limit are written by the zip file itself
+    monkeypatch.setattr(io, "_ZIP_PARALLEL_LIMIT", 4000)
+
+    fp = Path(tmpdir, "parallel.zip")
+    io.zip(src, fp, compression=compression, compresslevel=1, workers=4)
+    serial = Path(tmpdir, "serial.zip")
+    io.zip(src, serial, compression=compression, compresslevel=1)
+
+    with zipfile.ZipFile(fp) as f, zipfile.ZipFile(serial) as g:
+        assert f.testzip() is None
+        assert f.namelist() == g.namelist()
+        for info in f.infolist():
+            assert f.read(info) == contents[info.filename]
+            if info.filename.endswith(".jpg"):
+                assert info.compress_type == zipfile.ZIP_STORED
+            else:
+                assert info.compress_type == io.ZIP_COMPRESSIONS[compression]
+
+    with pytest.raises(ValueError):
+        io.zip(src, fp, compression="zstd")
+
+
+def test_zip_parallel_internals(dummy_directory, tmpdir, monkeypatch):
+    # the parallel writer must keep working on every supported python
+    with zipfile.ZipFile(Path(tmpdir, "check.zip"), "w") as f:
+        assert io._supports_member_writes(f)
+
+    # and fall back to ZipFile.write if the internals change
+    def write_member(*args):
+        raise AssertionError("members should be written by ZipFile.write")
+
+    monkeypatch.setattr(io, "_supports_member_writes", lambda f: False)
+    monkeypatch.setattr(io, "_write_member", write_member)
+    fp = Path(tmpdir, "fallback.zip")
+    io.zip(dummy_directory["path"], fp, workers=4)
+    with zipfile.ZipFile(fp) as f:
+        assert f.testzip() is None
+        assert len(f.namelist()) == dummy_directory["file_num"]
+
+
 def test_unzip(dummy_zip, tmpdir):
     directory = Path(tmpdir, "dummy_files")
     io.unzip(dummy_zip["path"], directory, create_directory=True)
 
     for file in dummy_zip["file_relative_path_list"]:
         assert Path(directory, file).exists(), file
+
+
+@pytest.mark.parametrize("workers", [None, 4])
+def test_unzip_selected(dummy_zip, tmpdir, workers):
+    names = [str(p) for p in dummy_zip["file_relative_path_list"]]
+
+    directory = Path(tmpdir, "all")
+    io.unzip(
+        dummy_zip["path"], directory, create_directory=True, workers=workers
+    )
+    assert sorted(map(str, search.get_files(directory))) == sorted(
+        str(Path(directory, name)) for name in names
+    )
+
+    extension = os.path.splitext(names[0])[1]
+    directory = Path(tmpdir, "extension")
+    io.unzip(
+        dummy_zip["path"],
+        directory,
+        create_directory=True,
+        extension=extension,
+        workers=workers,
+    )
+    assert sorted(map(str, search.get_files(directory))) == sorted(
+        str(Path(directory, name))
+        for name in names
+        if name.endswith(extension)
+    )
+
+    prefix = names[-1].rpartition("/")[0] + "/"
+    directory = Path(tmpdir, "prefix")
+    io.unzip(
+        dummy_zip["path"],
+        directory,
+        create_directory=True,
+        prefix=prefix,
+        pattern="*" + extension,
+        workers=workers,
+    )
+    assert sorted(map(str, search.get_files(directory))) == sorted(
+        str(Path(directory, name))
+        for name in names
+        if name.startswith(prefix) and name.endswith(extension)
+    )
+
+
+def test_iter_zip_members(dummy_zip):
+    members = dict(io.iter_zip_members(dummy_zip["path"]))
+    assert sorted(members) == sorted(
+        map(str, dummy_zip["file_relative_path_list"])
+    )
+    for name, path in zip(
+        dummy_zip["file_relative_path_list"], dummy_zip["file_list"]
+    ):
+        assert members[str(name)] == Path(path).read_bytes()
+
+    assert not list(io.iter_zip_members(dummy_zip["path"], prefix="missing/"))
+
+
+@pytest.mark.parametrize("suffix", [".tar", ".tar.gz", ".tar.zst"])
+def test_archive_extract(dummy_directory, tmpdir, suffix):
+    if suffix == ".tar.zst":
+        pytest.importorskip("zstandard")
+    names = sorted(map(str, dummy_directory["file_relative_path_list"]))
+
+    fp = Path(tmpdir, "archives", "dummy" + suffix)
+    io.archive(dummy_directory["path"], fp, create_directory=True)
+    directory = Path(tmpdir, "extracted")
+    io.extract(fp, directory, create_directory=True)
+    assert (
+        sorted(
+            str(Path(file).relative_to(directory))
+            for file in search.get_files(directory)
+        )
+        == names
+    )
+    for name in names:
+        assert (
+            Path(directory, name).read_bytes()
+            == Path(dummy_directory["path"], name).read_bytes()
+        )
+
+    # from a pipe, with an extension filter
+    extension = os.path.splitext(names[0])[1]
+    directory = Path(tmpdir, "piped")
+    read_fd, write_fd = os.pipe()
+    with open(read_fd, "rb", buffering=0) as reader:
+        with open(write_fd, "wb") as writer:
+            writer.write(fp.read_bytes())
+        io.extract(
+            reader, directory, create_directory=True, extension=extension
+        )
+    assert sorted(
+        str(Path(file).relative_to(directory))
+        for file in search.get_files(directory)
+    ) == [name for name in names if name.endswith(extension)]
+
+    if suffix != ".tar":
+        fp = Path(tmpdir, "archives", "fast" + suffix)
+        io.archive(dummy_directory["path"], fp, compresslevel=1)
+        directory = Path(tmpdir, "fast")
+        io.extract(fp, directory, create_directory=True)
+        assert (
+            sorted(
+                str(Path(file).relative_to(directory))
+                for file in search.get_files(directory)
+            )
+            == names
+        )
+
+
+def test_archive_format(dummy_directory, tmpdir, monkeypatch):
+    with pytest.raises(ValueError):
+        io.archive(dummy_directory["path"], Path(tmpdir, "dummy.rar"))
+    with pytest.raises(ValueError):
+        io.archive(dummy_directory["path"], Path(tmpdir, "a"), format="rar")
+
+    monkeypatch.setattr(io, "zstandard", None)
+    with pytest.raises(ImportError):
+        io.archive(dummy_directory["path"], Path(tmpdir, "dummy.tar.zst"))
+
+
+def test_move_files_rename_subtrees(dummy_directory, tmpdir):
+    src = Path(tmpdir, "src")
+    shutil.copytree(dummy_directory["path"], src)
+    subdirectories = [p for p in src.iterdir() if p.is_dir()]
+    top_files = [p for p in src.iterdir() if p.is_file()]
+    dst = Path(tmpdir, "dst")
+
+    result = io.move_files_to_directory(src, dst, create_directory=True)
+    assert result.directories == len(subdirectories)
+    assert result.files == len(top_files)
+    assert not search.get_files(src)
+    assert len(search.get_files(dst)) == dummy_directory["file_num"]
+
+    # merge into an existing tree, moving files on a pool of threads
+    shutil.copytree(dummy_directory["path"], src, dirs_exist_ok=True)
+    Path(src, subdirectories[0].name, "new.txt").write_text("new")
+    result = io.move_files_to_directory(src, dst, workers=4)
+    assert result.directories == 0
+    assert result.files == dummy_directory["file_num"] + 1
+    assert not search.get_files(src)
+    assert Path(dst, subdirectories[0].name, "new.txt").read_text() == "new"
+
+
+@pytest.mark.parametrize("backup", ["backup", os.path.join("sub", "backup")])
+def test_move_files_into_subdirectory(dummy_directory, tmpdir, backup):
+    src = Path(tmpdir, "src")
+    shutil.copytree(dummy_directory["path"], src)
+    files = [file.relative_to(src) for file in search.get_files(src)]
+    dst = Path(src, backup)
+
+    result = io.move_files_to_directory(src, dst, create_directory=True)
+    assert result.files + result.directories > 0
+    assert sorted(
+        file.relative_to(dst) for file in search.get_files(dst)
+    ) == sorted(files)
+    assert all(file.is_relative_to(dst) for file in search.get_files(src))
+
+
+def test_copy_and_unlink_file(tmpdir):
+    src = Path(tmpdir, "src.txt")
+    src.write_text("data")
+    dst = Path(tmpdir, "dst.txt")
+    assert io._copy_and_unlink_file(src, dst, verify=True) == 4
+    assert not src.exists()
+    assert dst.read_text() == "data"
+
+    link = Path(tmpdir, "link")
+    link.symlink_to(dst)
+    io._copy_and_unlink_file(link, Path(tmpdir, "moved_link"))
+    assert not os.path.lexists(link)
+    assert os.readlink(Path(tmpdir, "moved_link")) == str(dst)
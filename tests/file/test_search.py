@@ -1,3 +1,9 @@
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
 from waffle_utils.file import search
 
 
@@ -116,3 +122,213 @@ def test_get_video_files(
             )
         )
     )
+
+
+def test_get_files_unsorted(
+    dummy_directory,
+):
+    files = search.get_files(dummy_directory["path"], sort=False)
+    assert sorted(files) == sorted(dummy_directory["file_list"])
+
+    files = search.get_files(
+        dummy_directory["path"], include_directories=True, sort=False
+    )
+    assert sorted(files) == sorted(
+        dummy_directory["file_list"] + dummy_directory["dir_list"]
+    )
+
+    files = search.get_directories(dummy_directory["path"], sort=False)
+    assert sorted(files) == sorted(dummy_directory["dir_list"])
+
+
+def test_iter_files(
+    dummy_directory,
+):
+    files = search.iter_files(dummy_directory["path"])
+    assert not isinstance(files, list)
+    assert sorted(files) == sorted(dummy_directory["file_list"])
+
+    files = list(search.iter_files(dummy_directory["path"], max_depth=2))
+    assert sorted(files) == sorted(
+        dummy_directory["file_tree"][1] + dummy_directory["file_tree"][2]
+    )
+
+    files = list(search.iter_files(dummy_directory["path"], recursive=False))
+    assert sorted(files) == sorted(dummy_directory["file_tree"][1])
+
+    # entries of each directory are yielded in natural order
+    files = list(search.iter_files(dummy_directory["path"], max_depth=1))
+    assert files == sorted(files, key=lambda x: x.name)
+
+    # early termination
+    files = search.iter_files(dummy_directory["path"])
+    assert next(files).parent == dummy_directory["path"]
+    files.close()
+
+    files = list(search.iter_directories(dummy_directory["path"]))
+    assert sorted(files) == sorted(dummy_directory["dir_list"])
+
+    files = list(
+        search.iter_directories(dummy_directory["path"], only_empty=True)
+    )
+    assert len(files) == 1
+
+    files = list(search.iter_image_files(dummy_directory["path"]))
+    assert sorted(files) == sorted(
+        search.get_image_files(dummy_directory["path"])
+    )
+
+    files = list(search.iter_video_files(dummy_directory["path"]))
+    assert sorted(files) == sorted(
+        search.get_video_files(dummy_directory["path"])
+    )
+
+
+def test_get_files_parallel(
+    dummy_directory,
+):
+    for workers in [1, 4]:
+        assert search.get_files(
+            dummy_directory["path"], workers=workers
+        ) == search.get_files(dummy_directory["path"])
+
+        assert search.get_files(
+            dummy_directory["path"], recursive=False, workers=workers
+        ) == search.get_files(dummy_directory["path"], recursive=False)
+
+        assert search.get_files(
+            dummy_directory["path"],
+            include_directories=True,
+            workers=workers,
+        ) == search.get_files(
+            dummy_directory["path"], include_directories=True
+        )
+
+        assert search.get_directories(
+            dummy_directory["path"], workers=workers
+        ) == search.get_directories(dummy_directory["path"])
+
+        assert search.get_image_files(
+            dummy_directory["path"], workers=workers
+        ) == search.get_image_files(dummy_directory["path"])
+
+
+def test_indexed_directory(dummy_directory, tmpdir):
+    root = dummy_directory["path"]
+
+    def settle(mtime_ns):
+        # directories modified within the mtime granularity are always re-listed
+        for directory in [root] + search.get_directories(root):
+            if os.stat(directory).st_mtime_ns > 10**18:
+                os.utime(directory, ns=(mtime_ns, mtime_ns))
+
+    settle(10**18)
+    index_path = Path(tmpdir, "index.sqlite")
+    with search.IndexedDirectory(root, index_path=index_path) as directory:
+        assert directory.get_files() == search.get_files(root)
+        assert directory.stats.relisted == dummy_directory["dir_num"] + 1
+        assert directory.stats.hits == 0
+
+    with search.IndexedDirectory(root, index_path=index_path) as directory:
+        assert directory.get_image_files() == search.get_image_files(root)
+        assert directory.stats.relisted == 0
+        assert directory.stats.hits == dummy_directory["dir_num"] + 1
+        assert directory.stats.files == dummy_directory["file_num"]
+
+        assert directory.get_files(
+            recursive=False, include_directories=True
+        ) == search.get_files(root, recursive=False, include_directories=True)
+
+        # only the changed directory is re-listed
+        Path(root, "sub", "new.png").touch()
+        shutil.rmtree(Path(root, "sub", "sub"))
+        settle(10**18 - 1)
+        assert directory.get_files() == search.get_files(root)
+        assert directory.stats.relisted == 1
+
+        entries = list(directory.iter_entries(extension=".png"))
+        assert sorted(path for path, _, _ in entries) == sorted(
+            search.get_files(root, extension=".png")
+        )
+
+        directory.invalidate()
+        directory.refresh()
+        assert directory.stats.hits == 0
+
+
+def test_extension_filter(dummy_directory):
+    matcher = search.ExtensionFilter([".PNG", ".tar.gz"])
+    assert matcher("a.png")
+    assert matcher("a.Png")
+    assert matcher("a.tar.gz")
+    assert matcher("a.TAR.GZ")
+    assert not matcher("a.gz")
+    assert not matcher(".png")
+    assert not matcher("png")
+
+    matcher = search.ExtensionFilter(
+        ".jpg", include="img_*", exclude="*_mask.jpg"
+    )
+    assert matcher("img_0.jpg")
+    assert not matcher("img_0_mask.jpg")
+    assert not matcher("label_0.jpg")
+    assert not matcher("img_0.png")
+
+    matcher = search.ExtensionFilter(include=r"\d{4}", regex=True)
+    assert matcher("frame_0001.png")
+    assert not matcher("frame_1.png")
+
+    files = search.get_files(
+        dummy_directory["path"],
+        extension=search.ExtensionFilter([".png", ".json"], exclude="*.json"),
+    )
+    assert files == search.get_files(dummy_directory["path"], extension=".png")
+
+
+def test_natural_sorted():
+    paths = ["a/img10.png", "a/img2.png", "a10/x", "a2/x", "a/b/img1.png"]
+    assert search.natural_sorted(paths) == [
+        "a2/x",
+        "a10/x",
+        "a/b/img1.png",
+        "a/img2.png",
+        "a/img10.png",
+    ]
+
+    # whole paths are compared, as natsort.natsorted does
+    paths = ["b/x", "b-1", "images/a.png", "images.json", "b-10", "b-2"]
+    assert search.natural_sorted(
+        [os.path.join(*path.split("/")) for path in paths]
+    ) == [
+        os.path.join(*path.split("/"))
+        for path in [
+            "b-1",
+            "b-2",
+            "b-10",
+            "b/x",
+            "images.json",
+            "images/a.png",
+        ]
+    ]
+
+
+def test_get_files_sort(dummy_directory):
+    root = dummy_directory["path"]
+
+    files = search.get_files(root, sort="lexical")
+    assert files == sorted(files, key=str)
+
+    files = search.get_files(root, sort="none")
+    assert sorted(files) == sorted(search.get_files(root))
+
+    for i, file in enumerate(search.get_files(root, sort="lexical")):
+        os.utime(file, ns=(10**18 - i, 10**18 - i))
+    files = search.get_files(root, sort="mtime")
+    assert files == search.get_files(root, sort="lexical")[::-1]
+
+    files = search.get_files(root, sort="size")
+    sizes = [file.stat().st_size for file in files]
+    assert sizes == sorted(sizes)
+
+    with pytest.raises(ValueError):
+        search.get_files(root, sort="random")
@@ -0,0 +1,586 @@
+import abc
+import functools
+import mmap
+import os
+import struct
+import threading
+import time
+import zipfile
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path, PurePath
+from typing import IO, Iterable, Iterator, Optional, Union
+
+from waffle_utils.file import io, search
+
+# signature and fixed size of a zip local file header
+_LOCAL_HEADER = struct.Struct("<4s22xHH")
+_LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+
+MANIFEST_NAME = "manifest.json"
+
+
+@functools.lru_cache(maxsize=32)
+def _read_index(
+    path: str, mtime_ns: int, size: int
+) -> dict[str, zipfile.ZipInfo]:
+    """Parse the central directory of a zip file, cached per version of the file.
+
+    Args:
+        path (str): absolute zip file path.
+        mtime_ns (int): modification time of the file, part of the cache key.
+        size (int): size of the file, part of the cache key.
+
+    Returns:
+        dict[str, zipfile.ZipInfo]: file members by name, in archive order.
+    """
+    with zipfile.ZipFile(path, "r") as f:
+        return {
+            info.filename: info for info in f.infolist() if not info.is_dir()
+        }
+
+
+class _MemberListing(abc.ABC):
+    """search.get_files-style listing of the file members of one or more archives."""
+
+    @abc.abstractmethod
+    def _member_names(self) -> Iterable[str]:
+        """Names of the file members, in archive order."""
+
+    @abc.abstractmethod
+    def getinfo(self, name: str) -> zipfile.ZipInfo:
+        """Header info of a member."""
+
+    def get_files(
+        self,
+        directory: str = None,
+        recursive: bool = True,
+        extension: Union[list[str], str, search.ExtensionFilter, None] = None,
+        sort: Union[str, bool] = "natural",
+    ) -> list[str]:
+        """
+        Get member names, like search.get_files over the archive contents.
+
+        Args:
+            directory (str, optional): list only members under this directory of the archive. Defaults to None(all).
+            recursive (bool, optional): list members of subdirectories. Defaults to True.
+            extension (Union[list[str], str, search.ExtensionFilter, None], optional): file extension(including ".") or filter. Defaults to None.
+            sort (Union[str, bool], optional): One of search.SORT_MODES. Defaults to "natural".
+
+        Returns:
+            list[str]: member names.
+        """
+        prefix = directory.strip("/") + "/" if directory else ""
+        extension = search._as_filter(extension)
+
+        names = []
+        for name in self._member_names():
+            if not name.startswith(prefix):
+                continue
+            if not recursive and "/" in name[len(prefix) :]:
+                continue
+            if extension is not None and not extension(
+                name.rpartition("/")[2]
+            ):
+                continue
+            names.append(name)
+
+        stats = None
+        if search._sort_mode(sort) in ("mtime", "size"):
+            stats = {}
+            for name in names:
+                info = self.getinfo(name)
+                mtime = time.mktime(info.date_time + (0, 0, -1))
+                stats[name] = (info.file_size, int(mtime) * 1_000_000_000)
+        return search._sort_paths(names, sort, stats=stats)
+
+    def get_image_files(
+        self,
+        directory: str = None,
+        recursive: bool = True,
+        sort: Union[str, bool] = "natural",
+    ) -> list[str]:
+        """
+        Get image member names.
+
+        Args:
+            directory (str, optional): list only members under this directory of the archive. Defaults to None(all).
+            recursive (bool, optional): list members of subdirectories. Defaults to True.
+            sort (Union[str, bool], optional): One of search.SORT_MODES. Defaults to "natural".
+
+        Returns:
+            list[str]: image member names.
+        """
+        return self.get_files(
+            directory,
+            recursive=recursive,
+            extension=search.IMAGE_EXTENSION_FILTER,
+            sort=sort,
+        )
+
+    def get_video_files(
+        self,
+        directory: str = None,
+        recursive: bool = True,
+        sort: Union[str, bool] = "natural",
+    ) -> list[str]:
+        """
+        Get video member names.
+
+        Args:
+            directory (str, optional): list only members under this directory of the archive. Defaults to None(all).
+            recursive (bool, optional): list members of subdirectories. Defaults to True.
+            sort (Union[str, bool], optional): One of search.SORT_MODES. Defaults to "natural".
+
+        Returns:
+            list[str]: video member names.
+        """
+        return self.get_files(
+            directory,
+            recursive=recursive,
+            extension=search.VIDEO_EXTENSION_FILTER,
+            sort=sort,
+        )
+
+
+class ZipDataset(_MemberListing):
+    """Random-access reader over the files of a zip archive, without extracting it.
+
+    The central directory is parsed once and cached for as long as the archive is
+    unchanged, so opening the same archive again is free. Members are looked up by
+    name in O(1). Stored members are served straight from a memory map of the
+    archive, and deflated members are inflated from it without going through the
+    ZipFile handle, so reads are safe and lock-free across threads.
+
+    Example:
+        >>> with ZipDataset("coco.zip") as dataset:
+        ...     for name in dataset.get_image_files("train2017"):
+        ...         image = dataset.read(name)
+    """
+
+    def __init__(self, src: Union[str, PurePath]):
+        """
+        Args:
+            src (Union[str, PurePath]): zip file path.
+        """
+        self.path = Path(src).absolute()
+        stat = os.stat(self.path)
+        self._index = _read_index(
+            str(self.path), stat.st_mtime_ns, stat.st_size
+        )
+        self._offsets = {}
+
+        self._file = open(self.path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._zipfile = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._index)
+
+    def _member_names(self) -> Iterable[str]:
+        return self._index
+
+    def __enter__(self) -> "ZipDataset":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def getinfo(self, name: str) -> zipfile.ZipInfo:
+        """
+        Get the header info of a member.
+
+        Args:
+            name (str): member name.
+
+        Raises:
+            KeyError: if there is no such member.
+
+        Returns:
+            zipfile.ZipInfo: member info.
+        """
+        try:
+            return self._index[name]
+        except KeyError:
+            raise KeyError(f"{name} is not in {self.path}") from None
+
+    def _data_offset(self, info: zipfile.ZipInfo) -> int:
+        offset = self._offsets.get(info.filename)
+        if offset is None:
+            signature, name_length, extra_length = _LOCAL_HEADER.unpack_from(
+                self._mmap, info.header_offset
+            )
+            if signature != _LOCAL_HEADER_SIGNATURE:
+                raise zipfile.BadZipFile(
+                    f"bad local header of {info.filename} in {self.path}"
+                )
+            offset = self._offsets[info.filename] = (
+                info.header_offset
+                + _LOCAL_HEADER.size
+                + name_length
+                + extra_length
+            )
+        return offset
+
+    def view(self, name: str) -> memoryview:
+        """
+        Get the data of a stored member without copying it.
+
+        The view points into a memory map of the archive and is only valid until the
+        dataset is closed. Unlike read(), the CRC-32 of the data is not checked.
+
+        Args:
+            name (str): member name.
+
+        Raises:
+            KeyError: if there is no such member.
+            ValueError: if the member is compressed or encrypted.
+
+        Returns:
+            memoryview: member data.
+        """
+        info = self.getinfo(name)
+        if info.compress_type != zipfile.ZIP_STORED or info.flag_bits & 0x1:
+            raise ValueError(f"{name} is not stored uncompressed")
+        offset = self._data_offset(info)
+        return memoryview(self._mmap)[offset : offset + info.file_size]
+
+    def read(self, name: str) -> bytes:
+        """
+        Read the data of a member.
+
+        Args:
+            name (str): member name.
+
+        Raises:
+            KeyError: if there is no such member.
+            zipfile.BadZipFile: if the data does not match its CRC-32.
+
+        Returns:
+            bytes: member data.
+        """
+        info = self.getinfo(name)
+        if info.flag_bits & 0x1:
+            # encrypted, left to zipfile
+            return self._open_zipfile().read(info)
+        if info.compress_type == zipfile.ZIP_STORED:
+            offset = self._data_offset(info)
+            data = self._mmap[offset : offset + info.file_size]
+        elif info.compress_type == zipfile.ZIP_DEFLATED:
+            offset = self._data_offset(info)
+            with memoryview(self._mmap) as view:
+                data = zlib.decompress(
+                    view[offset : offset + info.compress_size],
+                    -zlib.MAX_WBITS,
+                    bufsize=max(info.file_size, 1),
+                )
+        else:
+            return self._open_zipfile().read(info)
+
+        # zipfile checks the CRC-32 of every member it reads, and so do we
+        if zlib.crc32(data) != info.CRC:
+            raise zipfile.BadZipFile(
+                f"bad CRC-32 of {info.filename} in {self.path}"
+            )
+        return data
+
+    def open(self, name: str) -> IO[bytes]:
+        """
+        Open a member as a binary file object.
+
+        Args:
+            name (str): member name.
+
+        Raises:
+            KeyError: if there is no such member.
+
+        Returns:
+            IO[bytes]: readable file object of the member.
+        """
+        return self._open_zipfile().open(self.getinfo(name))
+
+    def _open_zipfile(self) -> zipfile.ZipFile:
+        handle = self._zipfile
+        if handle is None:
+            with self._lock:
+                handle = self._zipfile
+                if handle is None:
+                    handle = self._zipfile = zipfile.ZipFile(self.path, "r")
+        return handle
+
+    def close(self) -> None:
+        """Close the archive. Views returned by view() must be released before."""
+        with self._lock:
+            if self._zipfile is not None:
+                self._zipfile.close()
+                self._zipfile = None
+        if not self._mmap.closed:
+            self._mmap.close()
+        self._file.close()
+
+
+def _write_zip_shard(
+    dst: Path,
+    members: list[tuple[Path, str]],
+    compress_type: int,
+    compresslevel: Optional[int],
+):
+    with zipfile.ZipFile(dst, "w") as f:
+        for src_file, arcname in members:
+            f.write(
+                src_file,
+                arcname=arcname,
+                compress_type=io._zip_compress_type(src_file, compress_type),
+                compresslevel=compresslevel,
+            )
+
+
+def write_zip_shards(
+    src: Union[str, PurePath, list],
+    dst: Union[str, PurePath],
+    shard_size: int = None,
+    shard_files: int = None,
+    recursive: bool = True,
+    extension: Union[str, list] = None,
+    create_directory: bool = False,
+    compression: str = "deflate",
+    compresslevel: int = None,
+    workers: int = None,
+) -> str:
+    """Zip file(s) or directory(s) into several zip files and a manifest
+
+    Files are split in listing order into shards named shard-00000.zip, shard-00001.zip, ...
+    A shard is closed when the next file would take it over shard_size bytes or it
+    holds shard_files files. Shards are written concurrently as they fill up. The
+    manifest (manifest.json) maps every member name to the index of its shard.
+
+    Args:
+        src (Union[str, PurePath, list]): file(s) or directory(s)
+        dst (Union[str, PurePath]): destination directory of the shards and the manifest
+        shard_size (int, optional): maximum number of bytes of source files per shard. Defaults to None.
+        shard_files (int, optional): maximum number of files per shard. Defaults to None.
+        recursive (bool, optional): zip recursively or not when zipping directory. Defaults to True.
+        extension (Union[str, list], optional): zip only specific extension(including "."). Defaults to None.
+        create_directory (bool, optional): create destination directory or not. Defaults to False.
+        compression (str, optional): one of "stored", "deflate", "bzip2" or "lzma". Defaults to "deflate".
+        compresslevel (int, optional): compression level of the codec. Defaults to None(codec default).
+        workers (int, optional): number of shards written at the same time. Defaults to None(one at a time).
+
+    Raises:
+        ValueError: if neither shard_size nor shard_files is given, or compression is unknown
+        FileNotFoundError: if dst is not exists. you can bypass this error with create_directory argument.
+
+    Returns:
+        str: manifest file path
+    """
+    if not shard_size and not shard_files:
+        raise ValueError("set shard_size or shard_files")
+    if compression not in io.ZIP_COMPRESSIONS:
+        raise ValueError(
+            f"compression should be one of {list(io.ZIP_COMPRESSIONS)}, not {compression}"
+        )
+    compress_type = io.ZIP_COMPRESSIONS[compression]
+
+    src_prefix, src_list = io._iter_sources(
+        src, recursive=recursive, extension=extension, exclude=dst
+    )
+
+    if create_directory:
+        io.make_directory(dst)
+
+    if not Path(dst).is_dir():
+        raise FileNotFoundError(
+            f"{dst} does not exist. please set 'create_directory' argument to be True to make directory."
+        )
+
+    mapping = io._PathMapper(src_prefix)
+
+    def shards() -> Iterator[list[tuple[Path, str]]]:
+        members, size = [], 0
+        for src_file in src_list:
+            file_size = os.stat(src_file).st_size
+            if members and (
+                (shard_files and len(members) >= shard_files)
+                or (shard_size and size + file_size > shard_size)
+            ):
+                yield members
+                members, size = [], 0
+            members.append((src_file, mapping.relative(src_file)))
+            size += file_size
+        if members:
+            yield members
+
+    workers = workers or 1
+    shard_names = []
+    member_shards = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for index, members in enumerate(shards()):
+            shard_name = f"shard-{index:05d}.zip"
+            shard_names.append(shard_name)
+            for _, arcname in members:
+                member_shards[arcname] = index
+            pending.add(
+                executor.submit(
+                    _write_zip_shard,
+                    Path(dst, shard_name),
+                    members,
+                    compress_type,
+                    compresslevel,
+                )
+            )
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+        for future in pending:
+            future.result()
+
+    manifest = Path(dst, MANIFEST_NAME)
+    io.save_json({"shards": shard_names, "members": member_shards}, manifest)
+    return str(manifest)
+
+
+class ShardedZipDataset(_MemberListing):
+    """Random-access reader over zip shards written by write_zip_shards.
+
+    Members are looked up in the manifest, so only the shard holding a member is
+    opened, on first use, as a ZipDataset.
+
+    Example:
+        >>> with ShardedZipDataset("shards/manifest.json") as dataset:
+        ...     image = dataset.read("train2017/000000000009.jpg")
+    """
+
+    def __init__(self, manifest: Union[str, PurePath]):
+        """
+        Args:
+            manifest (Union[str, PurePath]): manifest file path, or the directory holding it.
+        """
+        manifest = Path(manifest).absolute()
+        if manifest.is_dir():
+            manifest = manifest / MANIFEST_NAME
+        self.manifest = manifest
+
+        content = io.load_json(manifest)
+        self.shards = [manifest.parent / name for name in content["shards"]]
+        self._members = content["members"]
+        self._datasets = [None] * len(self.shards)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._members)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._members
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._members)
+
+    def __enter__(self) -> "ShardedZipDataset":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _member_names(self) -> Iterable[str]:
+        return self._members
+
+    def shard(self, name: str) -> ZipDataset:
+        """
+        Get the shard holding a member.
+
+        Args:
+            name (str): member name.
+
+        Raises:
+            KeyError: if there is no such member.
+
+        Returns:
+            ZipDataset: the shard.
+        """
+        try:
+            index = self._members[name]
+        except KeyError:
+            raise KeyError(f"{name} is not in {self.manifest}") from None
+
+        dataset = self._datasets[index]
+        if dataset is None:
+            with self._lock:
+                dataset = self._datasets[index]
+                if dataset is None:
+                    dataset = self._datasets[index] = ZipDataset(
+                        self.shards[index]
+                    )
+        return dataset
+
+    def getinfo(self, name: str) -> zipfile.ZipInfo:
+        """
+        Get the header info of a member.
+
+        Args:
+            name (str): member name.
+
+        Raises:
+            KeyError: if there is no such member.
+
+        Returns:
+            zipfile.ZipInfo: member info.
+        """
+        return self.shard(name).getinfo(name)
+
+    def view(self, name: str) -> memoryview:
+        """
+        Get the data of a stored member without copying it. See ZipDataset.view.
+
+        Args:
+            name (str): member name.
+
+        Returns:
+            memoryview: member data.
+        """
+        return self.shard(name).view(name)
+
+    def read(self, name: str) -> bytes:
+        """
+        Read the data of a member.
+
+        Args:
+            name (str): member name.
+
+        Raises:
+            KeyError: if there is no such member.
+
+        Returns:
+            bytes: member data.
+        """
+        return self.shard(name).read(name)
+
+    def open(self, name: str) -> IO[bytes]:
+        """
+        Open a member as a binary file object.
+
+        Args:
+            name (str): member name.
+
+        Raises:
+            KeyError: if there is no such member.
+
+        Returns:
+            IO[bytes]: readable file object of the member.
+        """
+        return self.shard(name).open(name)
+
+    def close(self) -> None:
+        """Close every opened shard."""
+        for index, dataset in enumerate(self._datasets):
+            if dataset is not None:
+                dataset.close()
+                self._datasets[index] = None
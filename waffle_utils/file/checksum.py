@@ -0,0 +1,284 @@
+import hashlib
+import mmap
+import os
+import sqlite3
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, Union
+
+from waffle_utils.file import search
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+_CHUNK_SIZE = 1024 * 1024
+# files at least this large are hashed from a memory map instead of read calls
+_MMAP_THRESHOLD = 64 * 1024 * 1024
+
+
+def _new_hash(algo: str):
+    if algo == "xxhash":
+        if xxhash is None:
+            raise ImportError(
+                "xxhash is not installed. install it with 'pip install xxhash'."
+            )
+        return xxhash.xxh3_128()
+    try:
+        return hashlib.new(algo)
+    except ValueError:
+        raise ValueError(
+            f"algo should be 'xxhash' or one of hashlib algorithms, not {algo}"
+        ) from None
+
+
+def hash_file(path: Union[str, Path], algo: str = "blake2b") -> str:
+    """
+    Hash the content of a file.
+
+    Args:
+        path (Union[str, Path]): Path to the file.
+        algo (str, optional): "xxhash" or a hashlib algorithm such as "blake2b" or "sha256". Defaults to "blake2b".
+
+    Raises:
+        ValueError: if algo is unknown
+        ImportError: if algo is "xxhash" and xxhash is not installed
+
+    Returns:
+        str: Hex digest.
+    """
+    digest = _new_hash(algo)
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= _MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                with memoryview(m) as view:
+                    for start in range(0, size, _CHUNK_SIZE):
+                        digest.update(view[start : start + _CHUNK_SIZE])
+        else:
+            buffer = bytearray(_CHUNK_SIZE)
+            with memoryview(buffer) as view:
+                while True:
+                    n = f.readinto(buffer)
+                    if not n:
+                        break
+                    digest.update(view[:n])
+    return digest.hexdigest()
+
+
+class HashCache:
+    """Persistent SQLite cache of file hashes, valid while size and mtime are unchanged.
+
+    Example:
+        >>> with HashCache() as cache:
+        ...     hashes = hash_files(search.get_files("dataset"), cache=cache)
+    """
+
+    def __init__(self, cache_path: Union[str, Path] = None):
+        """
+        Args:
+            cache_path (Union[str, Path], optional): Path to the cache file. Defaults to
+                $XDG_CACHE_HOME/waffle_utils/hash.sqlite (~/.cache if unset).
+        """
+        if cache_path is None:
+            cache_path = Path(
+                os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache"),
+                "waffle_utils",
+                "hash.sqlite",
+            )
+        self.cache_path = Path(cache_path).absolute()
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._connection = sqlite3.connect(self.cache_path)
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS hashes (
+                path TEXT NOT NULL,
+                algo TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                digest TEXT NOT NULL,
+                PRIMARY KEY (path, algo)
+            )
+            """
+        )
+
+    def __enter__(self) -> "HashCache":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Close the cache."""
+        self._connection.close()
+
+    def get(self, path: str, algo: str, stat: os.stat_result) -> str:
+        """
+        Get the cached hash of a file if it did not change since it was hashed.
+
+        Args:
+            path (str): Absolute path to the file.
+            algo (str): Hash algorithm.
+            stat (os.stat_result): Current stat of the file.
+
+        Returns:
+            str: Hex digest, or None if not cached or outdated.
+        """
+        row = self._connection.execute(
+            "SELECT size, mtime_ns, digest FROM hashes WHERE path = ? AND algo = ?",
+            (path, algo),
+        ).fetchone()
+        if row is None or row[:2] != (stat.st_size, stat.st_mtime_ns):
+            return None
+        return row[2]
+
+    def put(
+        self, records: Iterable[tuple[str, str, os.stat_result, str]]
+    ) -> None:
+        """
+        Store hashes.
+
+        Args:
+            records (Iterable[tuple[str, str, os.stat_result, str]]): (path, algo, stat, digest) of hashed files.
+        """
+        with self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?)",
+                (
+                    (path, algo, stat.st_size, stat.st_mtime_ns, digest)
+                    for path, algo, stat, digest in records
+                ),
+            )
+
+    def invalidate(self):
+        """Drop every cached hash."""
+        with self._connection:
+            self._connection.execute("DELETE FROM hashes")
+
+
+def hash_files(
+    paths: Iterable[Union[str, Path]],
+    algo: str = "blake2b",
+    workers: int = None,
+    cache: Union[HashCache, str, Path, None] = None,
+) -> dict[Path, str]:
+    """
+    Hash the content of many files, optionally on a pool of threads.
+
+    Hash functions release the GIL while hashing large buffers, so threads hash
+    files in parallel without the cost of processes. With a cache, files whose
+    size and mtime did not change since they were hashed are not read again.
+
+    Args:
+        paths (Iterable[Union[str, Path]]): Paths to the files.
+        algo (str, optional): "xxhash" or a hashlib algorithm such as "blake2b" or "sha256". Defaults to "blake2b".
+        workers (int, optional): Number of threads. Defaults to None(serial).
+        cache (Union[HashCache, str, Path, None], optional): HashCache or path to its file. Defaults to None(no cache).
+
+    Raises:
+        ValueError: if algo is unknown
+        ImportError: if algo is "xxhash" and xxhash is not installed
+
+    Returns:
+        dict[Path, str]: Hex digest of every file, in the order of paths.
+    """
+    _new_hash(algo)
+    paths = [Path(path) for path in paths]
+
+    own_cache = cache is not None and not isinstance(cache, HashCache)
+    if own_cache:
+        cache = HashCache(cache)
+
+    try:
+        hashes = dict.fromkeys(paths)
+        todo = []
+        for path in paths:
+            if cache is None:
+                todo.append((path, None))
+                continue
+            stat = os.stat(path)
+            digest = cache.get(str(path.absolute()), algo, stat)
+            if digest is None:
+                todo.append((path, stat))
+            else:
+                hashes[path] = digest
+
+        if workers:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                digests = list(
+                    executor.map(
+                        lambda path: hash_file(path, algo),
+                        [path for path, _ in todo],
+                    )
+                )
+        else:
+            digests = [hash_file(path, algo) for path, _ in todo]
+
+        for (path, _), digest in zip(todo, digests):
+            hashes[path] = digest
+        if cache is not None:
+            cache.put(
+                (str(path.absolute()), algo, stat, digest)
+                for (path, stat), digest in zip(todo, digests)
+            )
+    finally:
+        if own_cache:
+            cache.close()
+
+    return hashes
+
+
+def find_duplicates(
+    directory: Union[str, Path],
+    recursive: bool = True,
+    extension: Union[list[str], str, search.ExtensionFilter, None] = None,
+    algo: str = "blake2b",
+    workers: int = None,
+    cache: Union[HashCache, str, Path, None] = None,
+) -> list[list[Path]]:
+    """
+    Find files with the same content.
+
+    Files are grouped by size first and only files sharing a size are hashed.
+
+    Args:
+        directory (Union[str, Path]): Path to the directory.
+        recursive (bool, optional): Search recursively. Defaults to True.
+        extension (Union[list[str], str, search.ExtensionFilter, None], optional): File extension(including ".") or filter. Defaults to None.
+        algo (str, optional): "xxhash" or a hashlib algorithm. Defaults to "blake2b".
+        workers (int, optional): Number of threads hashing files. Defaults to None(serial).
+        cache (Union[HashCache, str, Path, None], optional): HashCache or path to its file. Defaults to None(no cache).
+
+    Returns:
+        list[list[Path]]: Groups of two or more identical files, in natural order.
+    """
+    by_size = defaultdict(list)
+    for path in search.iter_files(
+        directory, recursive=recursive, extension=extension, sort=False
+    ):
+        by_size[os.path.getsize(path)].append(path)
+
+    groups = []
+    candidates = []
+    for size, paths in by_size.items():
+        if len(paths) < 2:
+            continue
+        if size == 0:
+            groups.append(paths)
+        else:
+            candidates.extend(paths)
+
+    by_hash = defaultdict(list)
+    hashes = hash_files(candidates, algo=algo, workers=workers, cache=cache)
+    for path, digest in hashes.items():
+        by_hash[(os.path.getsize(path), digest)].append(path)
+    groups.extend(paths for paths in by_hash.values() if len(paths) > 1)
+
+    groups = {
+        str(paths[0]): [Path(path) for path in paths]
+        for paths in (search.natural_sorted(map(str, g)) for g in groups)
+    }
+    return [groups[first] for first in search.natural_sorted(groups)]
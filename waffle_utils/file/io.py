@@ -1,37 +1,304 @@
+import builtins
+import errno
+import fnmatch
+import functools
+import gzip
+import itertools
 import json
 import os
+import re
 import shutil
+import stat
+import sys
+import tarfile
+import threading
+import time
 import zipfile
+import zlib
+from collections import OrderedDict, abc, deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from io import BufferedReader
 from pathlib import Path, PurePath
-from typing import Any, Union
+from typing import IO, Any, Callable, Iterable, Iterator, Optional, Union
 
 import yaml
 
-from waffle_utils.file import search
+from waffle_utils.file import checksum, search
+from waffle_utils.file.types import COMPRESSED_EXTENSIONS
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+_COPY_CHUNK_SIZE = 8 * 1024 * 1024
+# files written through raw descriptors must not translate newlines on Windows
+_O_BINARY = getattr(os, "O_BINARY", 0)
+# Windows refuses to replace a file open in another process, so atomic saves retry
+_RETRY_REPLACE = os.name == "nt"
+_REPLACE_TIMEOUT = 2.0
+
+ZIP_COMPRESSIONS = {
+    "stored": zipfile.ZIP_STORED,
+    "deflate": zipfile.ZIP_DEFLATED,
+    "bzip2": zipfile.ZIP_BZIP2,
+    "lzma": zipfile.ZIP_LZMA,
+}
+ARCHIVE_FORMATS = {
+    ".tar": "tar",
+    ".tar.gz": "gz",
+    ".tgz": "gz",
+    ".tar.zst": "zst",
+    ".tzst": "zst",
+}
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# in order of preference, "json" is the standard library
+JSON_BACKENDS = ("orjson", "ujson", "simdjson", "json")
+
+_JSON_CHUNK_SIZE = 1024 * 1024
+# largest byte range of a json lines file parsed by one worker at a time
+_JSONL_CHUNK_SIZE = 32 * 1024 * 1024
+
+# "c" is libyaml, which PyYAML may be built without
+YAML_BACKENDS = ("c", "python")
+
+MANIFEST_VERSION = 1
+# never listed in manifests, wherever the manifest itself is written
+_MANIFEST_NAME = "manifest.jsonl"
+
+# members larger than this are compressed by the writer itself, not in memory
+_ZIP_PARALLEL_LIMIT = 64 * 1024 * 1024
+
+
+def _json_backend(backend: str = None) -> str:
+    """Pick a json backend, the fastest installed one if not given.
 
+    Args:
+        backend (str, optional): one of JSON_BACKENDS. Defaults to None(fastest installed).
+
+    Raises:
+        ValueError: if backend is unknown
+        ImportError: if backend is not installed
+
+    Returns:
+        str: backend name.
+    """
+    modules = {
+        "orjson": orjson,
+        "ujson": ujson,
+        "simdjson": simdjson,
+        "json": json,
+    }
+    if backend is None:
+        return next(
+            name for name in JSON_BACKENDS if modules[name] is not None
+        )
+    if backend not in JSON_BACKENDS:
+        raise ValueError(
+            f"backend should be one of {JSON_BACKENDS}, not {backend}"
+        )
+    if modules[backend] is None:
+        raise ImportError(
+            f"{backend} is not installed. install it with 'pip install {backend}'."
+        )
+    return backend
+
+
+def _json_dumps(obj: Any, backend: str) -> bytes:
+    """Serialize to compact json on a single line."""
+    if backend == "orjson":
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            # types orjson does not serialize, such as integers over 64 bits
+            pass
+    elif backend == "ujson":
+        return ujson.dumps(
+            obj, ensure_ascii=False, escape_forward_slashes=False
+        ).encode()
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def _json_loads(data: bytes, backend: str) -> Any:
+    if backend != "json":
+        loads = {
+            "orjson": orjson and orjson.loads,
+            "ujson": ujson and ujson.loads,
+            "simdjson": simdjson and simdjson.loads,
+        }[backend]
+        try:
+            return loads(data)
+        except ValueError:
+            # what only the standard library accepts, such as NaN or huge integers
+            pass
+    return json.loads(data)
+
+
+def _fsync_directory(directory: Union[str, Path]):
+    # directories cannot be opened for fsync on Windows, where renames are durable
+    if os.name == "nt":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _open_temporary(fp: Path) -> tuple[Path, int]:
+    tmp = fp.with_name(f".{fp.name}.{os.getpid()}.{os.urandom(4).hex()}.tmp")
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | _O_BINARY
+    return tmp, os.open(tmp, flags, 0o666)
+
+
+def _replace_file(tmp: Path, fp: Path):
+    """Rename tmp over fp, keeping the permission bits of an existing fp.
+
+    On Windows a file cannot be replaced while another process has it open, which
+    readers polling fp do for a moment at a time, so the rename is retried for up
+    to _REPLACE_TIMEOUT seconds.
+    """
+    try:
+        mode = os.stat(fp).st_mode
+    except FileNotFoundError:
+        pass
+    else:
+        os.chmod(tmp, stat.S_IMODE(mode))
+
+    delay = 0.001
+    deadline = time.monotonic() + _REPLACE_TIMEOUT
+    while True:
+        try:
+            os.replace(tmp, fp)
+            return
+        except PermissionError:
+            if not _RETRY_REPLACE or time.monotonic() >= deadline:
+                raise
+        time.sleep(delay)
+        delay = min(delay * 2, 0.05)
+
+
+@contextmanager
+def _atomic_file(
+    fp: Union[str, Path], mode: str = "wb", fsync: bool = False
+) -> Iterator[IO]:
+    """Open a temporary file next to fp which replaces fp once written.
+
+    Readers see either the old file or the complete new one, never a partial
+    write, and an error leaves the old file untouched. If fp is a symbolic link,
+    the file it points to is replaced and the link is kept.
+
+    Args:
+        fp (Union[str, Path]): file path.
+        mode (str, optional): "wb" or "w"(utf-8 text). Defaults to "wb".
+        fsync (bool, optional): flush the file and the rename to disk before returning. Defaults to False.
 
-def save_json(obj: Any, fp: Union[str, Path], create_directory: bool = False):
+    Yields:
+        IO: file object to write.
+    """
+    fp = Path(os.path.realpath(fp))
+    tmp, fd = _open_temporary(fp)
+    try:
+        text = {} if "b" in mode else {"encoding": "utf-8", "newline": "\n"}
+        with open(fd, mode, **text) as f:
+            yield f
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        _replace_file(tmp, fp)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    if fsync:
+        _fsync_directory(fp.parent)
+
+
+def _json_bytes(obj: Any, compact: bool = False, backend: str = None) -> bytes:
+    if compact:
+        return _json_dumps(obj, _json_backend(backend))
+    return json.dumps(obj, ensure_ascii=False, indent=4).encode()
+
+
+def save_json(
+    obj: Any,
+    fp: Union[str, Path],
+    create_directory: bool = False,
+    compact: bool = False,
+    backend: str = None,
+    fsync: bool = False,
+):
     """save json file
 
+    Pretty-printed files are always written by the standard library, so their layout
+    does not depend on what is installed, and are streamed to the file as they are
+    encoded. Compact files are written by orjson or ujson when available (simdjson
+    only parses). The file is written to a temporary file and renamed over fp, so
+    readers never see it half-written.
+
     Args:
         obj (Any): Any object that can be converted to json format.
         fp (Union[str, Path]): file path.
         create_directory (bool, optional): this determines whether create parent directory or not. Default to False.
+        compact (bool, optional): write without indentation and spaces, which is much faster. Default to False.
+        backend (str, optional): one of JSON_BACKENDS used for compact files. Default to None(fastest installed).
+        fsync (bool, optional): flush the file and its directory to disk, so it survives a crash. Default to False.
     """
 
     fp = Path(fp)
     if create_directory:
         make_directory(fp.parent)
 
-    with open(fp, "w") as f:
-        json.dump(obj, f, ensure_ascii=False, indent=4)
+    if not compact:
+        with _atomic_file(fp, mode="w", fsync=fsync) as f:
+            json.dump(obj, f, ensure_ascii=False, indent=4)
+        return
 
+    data = _json_bytes(obj, compact=True, backend=backend)
+    with _atomic_file(fp, fsync=fsync) as f:
+        f.write(data)
 
-def load_json(fp: Union[str, Path]) -> dict:
+
+def load_json(fp: Union[str, Path], backend: str = None) -> dict:
     """load json file
 
     Args:
         fp (Union[str, Path]): file path.
+        backend (str, optional): one of JSON_BACKENDS. Default to None(fastest installed).
 
     Returns:
         dict: dictionary
@@ -42,34 +309,459 @@ def load_json(fp: Union[str, Path]) -> dict:
     if not fp.exists():
         raise FileNotFoundError(f"{fp} does not exists")
 
-    with open(fp) as f:
-        d = json.load(f)
+    backend = _json_backend(backend)
+    if backend == "json":
+        # files are saved as utf-8 whatever the locale
+        with open(fp, encoding="utf-8") as f:
+            return json.load(f)
+
+    with open(fp, "rb") as f:
+        d = _json_loads(f.read(), backend)
 
     return d
 
 
-def save_yaml(obj: Any, fp: Union[str, Path], create_directory: bool = False):
+class _JsonStream:
+    """Incremental reader of a json text, decoding one value at a time."""
+
+    _decoder = json.JSONDecoder()
+    _whitespace = re.compile(r"[ \t\n\r]*")
+    _number = "0123456789.eE+-"
+
+    def __init__(self, f):
+        self.f = f
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _read(self, grow: bool = False) -> bool:
+        if self.eof:
+            return False
+        size = _JSON_CHUNK_SIZE
+        if grow:
+            # doubling keeps decoding a value larger than a chunk linear
+            size = max(size, len(self.buffer) - self.pos)
+        chunk = self.f.read(size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos :] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            self.pos = self._whitespace.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._read():
+                return ""
+
+    def take(self) -> str:
+        char = self.peek()
+        if not char:
+            raise json.JSONDecodeError(
+                "unexpected end of data", self.buffer, self.pos
+            )
+        self.pos += 1
+        return char
+
+    def decode(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self._read(grow=True):
+                    raise
+                continue
+            # a number cut by the end of the buffer goes on in the next chunk
+            if (
+                end < len(self.buffer) and self.buffer[end] not in self._number
+            ) or not self._read(grow=True):
+                self.pos = end
+                return value
+
+    def items(self, path: list[str]) -> Iterator[Any]:
+        if not path:
+            yield self.decode()
+            return
+
+        key, rest = path[0], path[1:]
+        char = self.peek()
+        if char == "[":
+            self.take()
+            if self.peek() == "]":
+                self.take()
+                return
+            while True:
+                if key == "item":
+                    yield from self.items(rest)
+                else:
+                    self.skip()
+                if self._next_delimiter("]"):
+                    return
+        elif char == "{":
+            self.take()
+            if self.peek() == "}":
+                self.take()
+                return
+            while True:
+                name = self.decode()
+                if self.take() != ":":
+                    raise json.JSONDecodeError(
+                        "expecting ':'", self.buffer, self.pos - 1
+                    )
+                if name == key:
+                    yield from self.items(rest)
+                else:
+                    self.skip()
+                if self._next_delimiter("}"):
+                    return
+        else:
+            self.skip()
+
+    def skip(self):
+        if self.peek() not in "[{":
+            self.decode()
+            return
+        # containers are skipped element by element, never decoded as a whole
+        for _ in self.items(["\0"]):
+            pass
+
+    def _next_delimiter(self, end: str) -> bool:
+        char = self.take()
+        if char == end:
+            return True
+        if char != ",":
+            raise json.JSONDecodeError(
+                f"expecting ',' or '{end}'", self.buffer, self.pos - 1
+            )
+        return False
+
+
+def iter_json(
+    fp: Union[str, Path], path: str = "item", backend: str = None
+) -> Iterator[Any]:
+    """iterate over the elements of an array nested in a json file, one at a time
+
+    Only the current element is held in memory, so files much larger than memory
+    can be read. The path is written like ijson prefixes: object keys joined by
+    dots and "item" for the elements of an array, e.g. "annotations.item" for the
+    annotations of a COCO file or "item" for a top level array. Values outside the
+    path are skipped without being built.
+
+    Args:
+        fp (Union[str, Path]): file path.
+        path (str, optional): path of the elements to yield. Default to "item".
+        backend (str, optional): "ijson" or "json"(built-in incremental reader). Default to None(ijson if installed).
+
+    Raises:
+        ValueError: if backend is unknown
+        ImportError: if backend is "ijson" and ijson is not installed
+
+    Yields:
+        Any: elements at the path.
+    """
+
+    fp = Path(fp)
+
+    if not fp.exists():
+        raise FileNotFoundError(f"{fp} does not exists")
+
+    if backend is None:
+        backend = "json" if ijson is None else "ijson"
+    if backend not in ("ijson", "json"):
+        raise ValueError(f"backend should be 'ijson' or 'json', not {backend}")
+    if backend == "ijson" and ijson is None:
+        raise ImportError(
+            "ijson is not installed. install it with 'pip install ijson'."
+        )
+
+    if backend == "ijson":
+        with open(fp, "rb") as f:
+            yield from ijson.items(f, path, use_float=True)
+        return
+
+    with open(fp, encoding="utf-8") as f:
+        yield from _JsonStream(f).items(path.split(".") if path else [])
+
+
+def _dump_stream(obj: Any, f):
+    if isinstance(obj, dict):
+        f.write("{")
+        for i, (key, value) in enumerate(obj.items()):
+            if i:
+                f.write(",\n")
+            f.write(json.dumps(str(key), ensure_ascii=False) + ": ")
+            _dump_stream(value, f)
+        f.write("}")
+    elif isinstance(obj, abc.Iterator):
+        f.write("[")
+        for i, item in enumerate(obj):
+            f.write(",\n" if i else "\n")
+            json.dump(item, f, ensure_ascii=False)
+        f.write("\n]")
+    else:
+        json.dump(obj, f, ensure_ascii=False)
+
+
+def save_json_stream(
+    obj: Union[Iterable, dict],
+    fp: Union[str, Path],
+    create_directory: bool = False,
+    fsync: bool = False,
+):
+    """save json file from generators, without building their arrays in memory
+
+    Iterators and generators are written as arrays, one element per line, as they are
+    consumed. Dictionaries are written key by key, so their values can be generators
+    too, e.g. {"images": images, "annotations": (a for a in annotations)}. Other
+    values are written as they are.
+
+    Args:
+        obj (Union[Iterable, dict]): iterable of the elements of a top level array, or a dictionary.
+        fp (Union[str, Path]): file path.
+        create_directory (bool, optional): this determines whether create parent directory or not. Default to False.
+        fsync (bool, optional): flush the file and its directory to disk, so it survives a crash. Default to False.
+    """
+
+    fp = Path(fp)
+    if create_directory:
+        make_directory(fp.parent)
+
+    if not isinstance(obj, (dict, abc.Iterator)):
+        obj = iter(obj)
+
+    with _atomic_file(fp, mode="w", fsync=fsync) as f:
+        _dump_stream(obj, f)
+
+
+def _parse_jsonl(data: bytes, backend: str) -> list:
+    return [
+        _json_loads(line, backend)
+        for line in data.splitlines()
+        if line.strip()
+    ]
+
+
+def _load_jsonl_range(fp: str, start: int, end: int, backend: str) -> list:
+    with open(fp, "rb") as f:
+        f.seek(start)
+        return _parse_jsonl(f.read(end - start), backend)
+
+
+def _jsonl_ranges(fp: Path, chunk_size: int) -> Iterator[tuple[int, int]]:
+    """Split a json lines file into byte ranges ending at line boundaries."""
+    size = os.path.getsize(fp)
+    with open(fp, "rb") as f:
+        start = 0
+        while start < size:
+            f.seek(min(start + chunk_size, size))
+            f.readline()
+            end = min(f.tell(), size)
+            yield start, end
+            start = end
+
+
+def iter_jsonl(
+    fp: Union[str, Path], backend: str = None, workers: int = None
+) -> Iterator[Any]:
+    """iterate over the records of a json lines file, one per line
+
+    With workers, the file is split into byte ranges at line boundaries which are
+    parsed by a pool of processes. Records are still yielded in file order.
+
+    Args:
+        fp (Union[str, Path]): file path.
+        backend (str, optional): one of JSON_BACKENDS. Default to None(fastest installed).
+        workers (int, optional): number of processes parsing the file. Default to None(in this process).
+
+    Yields:
+        Any: records.
+    """
+
+    fp = Path(fp)
+
+    if not fp.exists():
+        raise FileNotFoundError(f"{fp} does not exists")
+
+    backend = _json_backend(backend)
+    if not workers:
+        with open(fp, "rb") as f:
+            for line in f:
+                if line.strip():
+                    yield _json_loads(line, backend)
+        return
+
+    chunk_size = max(
+        _JSON_CHUNK_SIZE,
+        min(_JSONL_CHUNK_SIZE, os.path.getsize(fp) // (workers * 4) + 1),
+    )
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for start, end in _jsonl_ranges(fp, chunk_size):
+            pending.append(
+                executor.submit(
+                    _load_jsonl_range, str(fp), start, end, backend
+                )
+            )
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def load_jsonl(
+    fp: Union[str, Path], backend: str = None, workers: int = None
+) -> list:
+    """load json lines file
+
+    Args:
+        fp (Union[str, Path]): file path.
+        backend (str, optional): one of JSON_BACKENDS. Default to None(fastest installed).
+        workers (int, optional): number of processes parsing the file. Default to None(in this process).
+
+    Returns:
+        list: records, one per line.
+    """
+
+    return list(iter_jsonl(fp, backend=backend, workers=workers))
+
+
+def save_jsonl(
+    records: Iterable[Any],
+    fp: Union[str, Path],
+    create_directory: bool = False,
+    backend: str = None,
+    fsync: bool = False,
+):
+    """save json lines file, one compact record per line
+
+    Args:
+        records (Iterable[Any]): objects that can be converted to json format, consumed lazily.
+        fp (Union[str, Path]): file path.
+        create_directory (bool, optional): this determines whether create parent directory or not. Default to False.
+        backend (str, optional): one of JSON_BACKENDS. Default to None(fastest installed).
+        fsync (bool, optional): flush the file and its directory to disk, so it survives a crash. Default to False.
+    """
+
+    fp = Path(fp)
+    if create_directory:
+        make_directory(fp.parent)
+
+    backend = _json_backend(backend)
+    with _atomic_file(fp, fsync=fsync) as f:
+        for record in records:
+            f.write(_json_dumps(record, backend) + b"\n")
+
+
+def append_jsonl(
+    records: Iterable[Any],
+    fp: Union[str, Path],
+    create_directory: bool = False,
+    backend: str = None,
+):
+    """append records to a json lines file, safely with other concurrent writers
+
+    The file is opened with O_APPEND and every record is written with a single write
+    call, so lines from processes appending to the same file never interleave.
+
+    Args:
+        records (Iterable[Any]): objects that can be converted to json format.
+        fp (Union[str, Path]): file path.
+        create_directory (bool, optional): this determines whether create parent directory or not. Default to False.
+        backend (str, optional): one of JSON_BACKENDS. Default to None(fastest installed).
+    """
+
+    fp = Path(fp)
+    if create_directory:
+        make_directory(fp.parent)
+
+    backend = _json_backend(backend)
+    fd = os.open(fp, os.O_WRONLY | os.O_APPEND | os.O_CREAT | _O_BINARY, 0o666)
+    try:
+        for record in records:
+            line = _json_dumps(record, backend) + b"\n"
+            written = os.write(fd, line)
+            while written < len(line):
+                # only a full disk or a signal splits a write to a regular file
+                written += os.write(fd, line[written:])
+    finally:
+        os.close(fd)
+
+
+def _yaml_backend(backend: str = None) -> str:
+    """Pick a yaml backend, libyaml if PyYAML was built with it and not given.
+
+    Args:
+        backend (str, optional): one of YAML_BACKENDS. Defaults to None("c" if available).
+
+    Raises:
+        ValueError: if backend is unknown
+        ImportError: if backend is "c" and PyYAML was built without libyaml
+
+    Returns:
+        str: backend name.
+    """
+    if backend is None:
+        return "c" if yaml.__with_libyaml__ else "python"
+    if backend not in YAML_BACKENDS:
+        raise ValueError(
+            f"backend should be one of {YAML_BACKENDS}, not {backend}"
+        )
+    if backend == "c" and not yaml.__with_libyaml__:
+        raise ImportError(
+            "PyYAML is built without libyaml. install libyaml and reinstall PyYAML to use the 'c' backend."
+        )
+    return backend
+
+
+def _yaml_bytes(obj: Any, backend: str = None) -> bytes:
+    if _yaml_backend(backend) == "c":
+        dumper = yaml.CSafeDumper
+    else:
+        dumper = yaml.SafeDumper
+    return yaml.dump(
+        obj, Dumper=dumper, indent=4, sort_keys=False, encoding="utf-8"
+    )
+
+
+def save_yaml(
+    obj: Any,
+    fp: Union[str, Path],
+    create_directory: bool = False,
+    backend: str = None,
+    fsync: bool = False,
+):
     """save yaml file
 
+    The file is written to a temporary file and renamed over fp, so readers never see
+    it half-written.
+
     Args:
         obj (Any): Any object that can be converted to yaml format.
         fp (Union[str, Path]): file path.
         create_directory (bool, optional): this determines whether create parent directory or not. Default to False.
+        backend (str, optional): "c"(libyaml CSafeDumper) or "python"(SafeDumper). Default to None("c" if available).
+        fsync (bool, optional): flush the file and its directory to disk, so it survives a crash. Default to False.
     """
 
     fp = Path(fp)
     if create_directory:
         make_directory(fp.parent)
 
-    with open(fp, "w") as f:
-        yaml.safe_dump(obj, f, indent=4, sort_keys=False)
+    data = _yaml_bytes(obj, backend=backend)
+    with _atomic_file(fp, fsync=fsync) as f:
+        f.write(data)
 
 
-def load_yaml(fp: Union[str, Path]) -> dict:
+def load_yaml(fp: Union[str, Path], backend: str = None) -> dict:
     """load yaml file
 
     Args:
         fp (Union[str, Path]): file path.
+        backend (str, optional): "c"(libyaml CSafeLoader) or "python"(SafeLoader). Default to None("c" if available).
 
     Returns:
         dict: dictionary
@@ -80,12 +772,813 @@ def load_yaml(fp: Union[str, Path]) -> dict:
     if not fp.exists():
         raise FileNotFoundError(f"{fp} does not exists")
 
+    if _yaml_backend(backend) == "c":
+        loader = yaml.CSafeLoader
+    else:
+        loader = yaml.SafeLoader
+
     with open(fp) as f:
-        d = yaml.safe_load(f)
+        d = yaml.load(f, Loader=loader)
 
     return d
 
 
+class BatchWriter:
+    """Collect many small json and yaml saves and write them together in one flush.
+
+    Objects are serialized when saved, and a later save to the same path replaces
+    the pending one. flush() writes every pending file to a temporary file, then
+    renames them all into place, so each file is replaced atomically. With fsync,
+    every file is synced before the renames and every directory once after them.
+
+    Example:
+        >>> with BatchWriter(fsync=True) as writer:
+        ...     for step, metrics in enumerate(history):
+        ...         writer.save_json(metrics, f"metrics/{step}.json")
+    """
+
+    def __init__(self, fsync: bool = False, max_pending: int = None):
+        """
+        Args:
+            fsync (bool, optional): flush the files and their directories to disk. Defaults to False.
+            max_pending (int, optional): flush automatically once this many files are pending. Defaults to None(only on flush).
+        """
+        self.fsync = fsync
+        self.max_pending = max_pending
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def __enter__(self) -> "BatchWriter":
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.flush()
+
+    def _add(self, fp: Union[str, Path], data: bytes, create_directory: bool):
+        fp = Path(fp).absolute()
+        if create_directory:
+            make_directory(fp.parent)
+        # write through symbolic links, as _atomic_file does
+        fp = Path(os.path.realpath(fp))
+        with self._lock:
+            self._pending[fp] = data
+            full = self.max_pending and len(self._pending) >= self.max_pending
+        if full:
+            self.flush()
+
+    def save_json(
+        self,
+        obj: Any,
+        fp: Union[str, Path],
+        create_directory: bool = False,
+        compact: bool = False,
+        backend: str = None,
+    ):
+        """
+        Queue a json file, like io.save_json.
+
+        Args:
+            obj (Any): Any object that can be converted to json format.
+            fp (Union[str, Path]): file path.
+            create_directory (bool, optional): this determines whether create parent directory or not. Default to False.
+            compact (bool, optional): write without indentation and spaces. Default to False.
+            backend (str, optional): one of JSON_BACKENDS used for compact files. Default to None(fastest installed).
+        """
+        self._add(
+            fp,
+            _json_bytes(obj, compact=compact, backend=backend),
+            create_directory,
+        )
+
+    def save_yaml(
+        self,
+        obj: Any,
+        fp: Union[str, Path],
+        create_directory: bool = False,
+        backend: str = None,
+    ):
+        """
+        Queue a yaml file, like io.save_yaml.
+
+        Args:
+            obj (Any): Any object that can be converted to yaml format.
+            fp (Union[str, Path]): file path.
+            create_directory (bool, optional): this determines whether create parent directory or not. Default to False.
+            backend (str, optional): "c" or "python". Default to None("c" if available).
+        """
+        self._add(fp, _yaml_bytes(obj, backend=backend), create_directory)
+
+    def flush(self):
+        """Write every pending file."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+
+        written = []
+        try:
+            for fp, data in pending.items():
+                tmp, fd = _open_temporary(fp)
+                written.append((tmp, fp))
+                with open(fd, "wb") as f:
+                    f.write(data)
+                    if self.fsync:
+                        f.flush()
+                        os.fsync(f.fileno())
+            for tmp, fp in written:
+                _replace_file(tmp, fp)
+        except BaseException:
+            for tmp, _ in written:
+                if os.path.exists(tmp):
+                    os.unlink(tmp)
+            raise
+
+        if self.fsync:
+            for directory in {fp.parent for fp in pending}:
+                _fsync_directory(directory)
+
+
+def _readonly(self, *args, **kwargs):
+    raise TypeError(
+        f"{type(self).__name__} is a read-only view of a cached_load result"
+    )
+
+
+class FrozenDict(dict):
+    """dict which cannot be modified, returned by cached_load(readonly=True)."""
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __copy__(self) -> dict:
+        return dict(self)
+
+    def __deepcopy__(self, memo) -> dict:
+        return _thaw(self)
+
+    def __reduce__(self):
+        # the default reduce of a dict subclass fills it with __setitem__
+        return FrozenDict, (dict(self),)
+
+
+class FrozenList(list):
+    """list which cannot be modified, returned by cached_load(readonly=True)."""
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _readonly
+    append = extend = insert = pop = remove = clear = _readonly
+    sort = reverse = _readonly
+
+    def __copy__(self) -> list:
+        return list(self)
+
+    def __deepcopy__(self, memo) -> list:
+        return _thaw(self)
+
+    def __reduce__(self):
+        # the default reduce of a list subclass fills it with extend
+        return FrozenList, (list(self),)
+
+
+for _dumper in (yaml.SafeDumper, getattr(yaml, "CSafeDumper", None)):
+    if _dumper is not None:
+        _dumper.add_representer(
+            FrozenDict, yaml.representer.SafeRepresenter.represent_dict
+        )
+        _dumper.add_representer(
+            FrozenList, yaml.representer.SafeRepresenter.represent_list
+        )
+
+
+def _freeze(obj: Any) -> Any:
+    if isinstance(obj, dict):
+        return FrozenDict((key, _freeze(value)) for key, value in obj.items())
+    if isinstance(obj, list):
+        return FrozenList(_freeze(value) for value in obj)
+    return obj
+
+
+def _thaw(obj: Any) -> Any:
+    if isinstance(obj, dict):
+        return {key: _thaw(value) for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [_thaw(value) for value in obj]
+    return obj
+
+
+@dataclass
+class CacheInfo:
+    """Statistics of the cached_load cache."""
+
+    hits: int = 0
+    misses: int = 0
+    size: int = 0
+    maxsize: int = 0
+
+
+# number of parsed files kept by cached_load
+CACHED_LOAD_MAXSIZE = 128
+
+_cached_loads = OrderedDict()
+_cached_load_lock = threading.Lock()
+_cached_load_info = CacheInfo()
+
+
+def _default_loader(fp: Path) -> Callable[[Path], Any]:
+    suffix = fp.suffix.lower()
+    if suffix == ".json":
+        return load_json
+    if suffix in (".yaml", ".yml"):
+        return load_yaml
+    if suffix == ".jsonl":
+        return load_jsonl
+    raise ValueError(
+        f"cannot infer how to load {fp}, use .json, .yaml, .yml or .jsonl or set loader"
+    )
+
+
+def cached_load(
+    fp: Union[str, Path],
+    readonly: bool = False,
+    loader: Callable[[Path], Any] = None,
+) -> Any:
+    """load json, yaml or json lines file, parsing it only once per version of the file
+
+    Parsed files are kept in an LRU cache of CACHED_LOAD_MAXSIZE entries keyed on the
+    path, mtime and size of the file, so a file is parsed again as soon as it changes.
+    The cached object is read-only. With readonly=True it is returned as is, made of
+    FrozenDict and FrozenList which raise TypeError on modification. Otherwise a
+    mutable copy is returned, which costs a deep copy but no parsing.
+
+    Args:
+        fp (Union[str, Path]): file path.
+        readonly (bool, optional): return the shared read-only object instead of a copy. Default to False.
+        loader (Callable[[Path], Any], optional): function parsing the file. Default to None(by extension).
+
+    Returns:
+        Any: parsed object.
+    """
+
+    fp = Path(fp).absolute()
+
+    if not fp.exists():
+        raise FileNotFoundError(f"{fp} does not exists")
+
+    if loader is None:
+        loader = _default_loader(fp)
+    stat = os.stat(fp)
+    key = (str(fp), stat.st_mtime_ns, stat.st_size, loader)
+
+    with _cached_load_lock:
+        obj = _cached_loads.get(key, _cached_loads)
+        if obj is not _cached_loads:
+            _cached_loads.move_to_end(key)
+            _cached_load_info.hits += 1
+        else:
+            _cached_load_info.misses += 1
+
+    if obj is _cached_loads:
+        obj = _freeze(loader(fp))
+        with _cached_load_lock:
+            # older versions of the file are never asked for again
+            for stale in [k for k in _cached_loads if k[0] == key[0]]:
+                del _cached_loads[stale]
+            _cached_loads[key] = obj
+            while len(_cached_loads) > CACHED_LOAD_MAXSIZE:
+                _cached_loads.popitem(last=False)
+
+    return obj if readonly else _thaw(obj)
+
+
+def cached_load_info() -> CacheInfo:
+    """get statistics of the cached_load cache
+
+    Returns:
+        CacheInfo: hits and misses since the last clear, current and maximum size.
+    """
+
+    with _cached_load_lock:
+        return CacheInfo(
+            hits=_cached_load_info.hits,
+            misses=_cached_load_info.misses,
+            size=len(_cached_loads),
+            maxsize=CACHED_LOAD_MAXSIZE,
+        )
+
+
+def clear_cached_load():
+    """empty the cached_load cache and reset its statistics"""
+
+    with _cached_load_lock:
+        _cached_loads.clear()
+        _cached_load_info.hits = _cached_load_info.misses = 0
+
+
+class _PathMapper:
+    """Map paths below a source prefix to the same relative paths below a destination.
+
+    The prefix is normalized once, so mapping a path is a single prefix check and
+    slice on strings instead of a Path.relative_to or a str.replace over the whole
+    path. Paths must be absolute and normalized like the ones yielded by _iter_sources.
+    """
+
+    def __init__(
+        self, src_prefix: Union[str, PurePath], dst: Union[str, PurePath] = ""
+    ):
+        """
+        Args:
+            src_prefix (Union[str, PurePath]): absolute directory that mapped paths are below.
+            dst (Union[str, PurePath], optional): directory to map paths into. Defaults to "".
+        """
+        self.src_prefix = str(Path(src_prefix))
+        self.dst = str(Path(dst)) if dst != "" else ""
+        # the root of a drive already ends with a separator
+        self._head = os.path.join(self.src_prefix, "")
+        self._dst_head = os.path.join(self.dst, "") if self.dst else ""
+
+    def relative(self, path: Union[str, PurePath]) -> str:
+        """
+        Get the path relative to the source prefix.
+
+        Args:
+            path (Union[str, PurePath]): path below the source prefix.
+
+        Raises:
+            ValueError: if path is not below the source prefix.
+
+        Returns:
+            str: relative path. "." for the source prefix itself.
+        """
+        path = str(path)
+        if path.startswith(self._head):
+            return path[len(self._head) :]
+        if path == self.src_prefix:
+            return "."
+        raise ValueError(f"{path} is not in the subpath of {self.src_prefix}")
+
+    def __call__(self, path: Union[str, PurePath]) -> str:
+        """
+        Map a path below the source prefix into the destination.
+
+        Args:
+            path (Union[str, PurePath]): path below the source prefix.
+
+        Raises:
+            ValueError: if path is not below the source prefix.
+
+        Returns:
+            str: path below the destination.
+        """
+        path = str(path)
+        if path.startswith(self._head):
+            return self._dst_head + path[len(self._head) :]
+        return os.path.join(self.dst, self.relative(path))
+
+
+def _resolve_sources(
+    src: Union[list, str, PurePath]
+) -> tuple[Path, list[Path]]:
+    """Validate source paths and find their common prefix.
+
+    The prefix is the common path of the given files' parents and the given
+    directories, which is known before anything is walked.
+
+    Args:
+        src (Union[list, str, PurePath]): 'file list' or 'file' or 'directory' or 'directory list'.
+
+    Raises:
+        FileNotFoundError: if src is unknown
+
+    Returns:
+        tuple[Path, list[Path]]: common prefix and absolute source paths.
+    """
+    if not isinstance(src, list):
+        src = [src]
+    src = [Path(src_path).absolute() for src_path in src]
+
+    roots = []
+    for src_path in src:
+        if src_path.is_file():
+            roots.append(src_path.parent)
+        elif src_path.is_dir():
+            roots.append(src_path)
+        else:
+            raise FileNotFoundError(f"{src_path} does not exists")
+
+    if not roots:
+        raise FileNotFoundError("src_list is empty")
+    src_prefix = (
+        roots[0] if len(roots) == 1 else Path(os.path.commonpath(roots))
+    )
+
+    return src_prefix, src
+
+
+def _iter_sources(
+    src: Union[list, str, PurePath],
+    recursive: bool = True,
+    extension: Union[str, list] = None,
+    include_directories: bool = False,
+    exclude: Union[str, PurePath] = None,
+) -> tuple[Path, Iterator[Path]]:
+    """Resolve source paths into a common prefix and a lazy iterator of files.
+
+    Directories are walked with search.iter_files, so files are yielded as soon as
+    they are found.
+
+    Args:
+        src (Union[list, str, PurePath]): 'file list' or 'file' or 'directory' or 'directory list'.
+        recursive (bool, optional): walk directories recursively or not. Defaults to True.
+        extension (Union[str, list], optional): yield only specific extension(including "."). Defaults to None.
+        include_directories (bool, optional): Whether to include directories or not. Defaults to False.
+        exclude (Union[str, PurePath], optional): directory that may be inside src and must not be walked lazily,
+            e.g. the destination. If given and inside a source directory, that source is listed up front. Defaults to None.
+
+    Raises:
+        FileNotFoundError: if src is unknown or empty
+
+    Returns:
+        tuple[Path, Iterator[Path]]: common prefix and source files.
+    """
+    src_prefix, src = _resolve_sources(src)
+
+    sources = []
+    for src_path in src:
+        if src_path.is_file():
+            sources.append([src_path])
+        else:
+            files = search.iter_files(
+                src_path,
+                recursive=recursive,
+                extension=extension,
+                include_directories=include_directories,
+            )
+            if exclude is not None and Path(exclude).absolute().is_relative_to(
+                src_path
+            ):
+                files = list(files)
+            sources.append(files)
+
+    src_files = itertools.chain.from_iterable(sources)
+    first = next(src_files, None)
+    if first is None:
+        raise FileNotFoundError("src_list is empty")
+
+    return src_prefix, itertools.chain([first], src_files)
+
+
+@dataclass
+class TransferResult:
+    """Summary of a copy or move of many files.
+
+    directories counts whole subtrees moved by a single rename, whose files are not
+    counted in files and bytes. In a dry run, files and bytes count what would be
+    transferred and planned lists the (source, destination) pairs.
+    """
+
+    files: int = 0
+    bytes: int = 0
+    directories: int = 0
+    skipped: int = 0
+    seconds: float = 0.0
+    failures: list[tuple[Path, Exception]] = field(default_factory=list)
+    planned: list[tuple[Path, Path]] = field(default_factory=list)
+
+    @property
+    def files_per_second(self) -> float:
+        return self.files / self.seconds if self.seconds else 0.0
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes / self.seconds if self.seconds else 0.0
+
+
+# errors that mean the zero-copy syscall is unusable for this pair of files
+_ZERO_COPY_UNSUPPORTED = {
+    errno.EXDEV,
+    errno.ENOSYS,
+    errno.EINVAL,
+    errno.EOPNOTSUPP,
+    errno.EBADF,
+    errno.ETXTBSY,
+}
+
+
+def _check_same_file(src: Union[str, Path], dst: Union[str, Path]):
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        raise shutil.SameFileError(f"{src} and {dst} are the same file")
+
+
+def _copy_file_data(
+    src: Union[str, Path],
+    dst: Union[str, Path],
+    preserve_times: bool = False,
+) -> int:
+    """Copy file contents and permission bits, in the kernel where possible.
+
+    os.copy_file_range lets the filesystem clone or server-side copy the data,
+    os.sendfile at least avoids user space, and a buffered copy is the fallback.
+
+    Args:
+        src (Union[str, Path]): source file path.
+        dst (Union[str, Path]): destination file path.
+        preserve_times (bool, optional): copy access and modification times too. Defaults to False.
+
+    Raises:
+        shutil.SameFileError: if src and dst are the same file.
+
+    Returns:
+        int: number of bytes copied.
+    """
+    _check_same_file(src, dst)
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        infd, outfd = fsrc.fileno(), fdst.fileno()
+        for syscall in (
+            getattr(os, "copy_file_range", None),
+            getattr(os, "sendfile", None) if sys.platform == "linux" else None,
+        ):
+            if syscall is None:
+                continue
+            copied = 0
+            try:
+                while True:
+                    if syscall is os.sendfile:
+                        n = syscall(outfd, infd, copied, _COPY_CHUNK_SIZE)
+                    else:
+                        n = syscall(infd, outfd, _COPY_CHUNK_SIZE)
+                    if n == 0:
+                        break
+                    copied += n
+            except OSError as e:
+                if copied or e.errno not in _ZERO_COPY_UNSUPPORTED:
+                    raise
+                continue
+            # some filesystems (procfs, overlays on old kernels) report 0 bytes
+            if copied == 0 and os.fstat(infd).st_size > 0:
+                continue
+            break
+        else:
+            shutil.copyfileobj(fsrc, fdst, _COPY_CHUNK_SIZE)
+            copied = fdst.tell()
+
+    if preserve_times:
+        shutil.copystat(src, dst)
+    else:
+        shutil.copymode(src, dst)
+    return copied
+
+
+COPY_STRATEGIES = ("copy", "hardlink", "symlink", "reflink", "auto")
+
+# ioctl request cloning a whole file on Linux (btrfs, xfs, bcachefs, ...)
+_FICLONE = 0x40049409
+
+
+def _reflink(src: Union[str, Path], dst: Union[str, Path]):
+    if fcntl is None or sys.platform != "linux":
+        raise OSError(
+            errno.EOPNOTSUPP, "reflink is only supported on Linux", str(dst)
+        )
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        try:
+            fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+        except OSError:
+            fdst.close()
+            os.unlink(dst)
+            raise
+
+
+def _is_placed(
+    src: Union[str, Path], dst: Union[str, Path], strategy: str
+) -> bool:
+    """Check if dst, the same file as src, already is the link strategy would make."""
+    if strategy == "symlink":
+        return os.path.islink(dst) and os.readlink(dst) == os.path.abspath(src)
+    if strategy not in ("hardlink", "auto") or os.path.islink(dst):
+        return False
+    # a second name of the inode, not the directory entry of src itself
+    src, dst = os.path.abspath(src), os.path.abspath(dst)
+    return os.path.basename(src) != os.path.basename(dst) or not (
+        os.path.samefile(os.path.dirname(src), os.path.dirname(dst))
+    )
+
+
+def _place_file(
+    src: Union[str, Path],
+    dst: Union[str, Path],
+    strategy: str = "copy",
+    preserve_times: bool = False,
+) -> int:
+    """Make dst hold the contents of src, replacing an existing dst file.
+
+    Strategies:
+        - "copy": copy the data.
+        - "hardlink": link dst to the same inode as src. Writing into either file in place changes both.
+        - "symlink": make dst a symbolic link to the absolute path of src.
+        - "reflink": clone src into a copy-on-write file sharing its blocks (btrfs, xfs, ...).
+        - "auto": try reflink, then hardlink, then copy.
+
+    Args:
+        src (Union[str, Path]): source file path.
+        dst (Union[str, Path]): destination file path.
+        strategy (str, optional): one of COPY_STRATEGIES. Defaults to "copy".
+        preserve_times (bool, optional): copy access and modification times too. Defaults to False.
+
+    Raises:
+        shutil.SameFileError: if src and dst are the same file, unless dst already is the link to make.
+        OSError: if the strategy is not possible for src and dst, e.g. across filesystems.
+
+    Returns:
+        int: size of the file.
+    """
+    # replacing dst would remove the data of src
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        if not _is_placed(src, dst, strategy):
+            raise shutil.SameFileError(f"{src} and {dst} are the same file")
+        return os.stat(src).st_size
+
+    if strategy == "copy":
+        # never write through a link into the source (or another fork) of dst
+        try:
+            dst_stat = os.lstat(dst)
+        except FileNotFoundError:
+            pass
+        else:
+            if stat.S_ISLNK(dst_stat.st_mode) or dst_stat.st_nlink > 1:
+                os.unlink(dst)
+        return _copy_file_data(src, dst, preserve_times=preserve_times)
+
+    if strategy == "auto":
+        for strategy in ("reflink", "hardlink"):
+            try:
+                return _place_file(
+                    src, dst, strategy=strategy, preserve_times=preserve_times
+                )
+            except OSError:
+                pass
+        return _copy_file_data(src, dst, preserve_times=preserve_times)
+
+    if os.path.lexists(dst):
+        os.unlink(dst)
+    if strategy == "hardlink":
+        os.link(src, dst)
+    elif strategy == "symlink":
+        os.symlink(os.path.abspath(src), dst)
+    elif strategy == "reflink":
+        _reflink(src, dst)
+        if preserve_times:
+            shutil.copystat(src, dst)
+        else:
+            shutil.copymode(src, dst)
+    else:
+        _check_strategy(strategy)
+    return os.stat(src).st_size
+
+
+def _check_strategy(strategy: str):
+    if strategy not in COPY_STRATEGIES:
+        raise ValueError(
+            f"strategy should be one of {COPY_STRATEGIES}, but got {strategy}"
+        )
+
+
+def _is_unchanged(
+    src: Union[str, Path], dst: Union[str, Path], verify: bool = False
+) -> bool:
+    """Check if dst is already an up-to-date copy of src.
+
+    Args:
+        src (Union[str, Path]): source file path.
+        dst (Union[str, Path]): destination file path.
+        verify (bool, optional): compare contents instead of modification times. Defaults to False.
+
+    Returns:
+        bool: True if dst exists with the same size, and with the same contents or a
+            modification time not older than src, False otherwise.
+    """
+    try:
+        dst_stat = os.stat(dst)
+    except FileNotFoundError:
+        return False
+    src_stat = os.stat(src)
+    if dst_stat.st_size != src_stat.st_size:
+        return False
+    if verify:
+        return checksum.hash_file(src) == checksum.hash_file(dst)
+    return dst_stat.st_mtime_ns >= src_stat.st_mtime_ns
+
+
+def _has_same_mtime(src: Union[str, Path], dst: Union[str, Path]) -> bool:
+    return os.stat(src).st_mtime_ns == os.stat(dst).st_mtime_ns
+
+
+def _incremental(
+    transfer: Callable[[Path, Path], int],
+    update: bool = False,
+    verify: bool = False,
+    dry_run: bool = False,
+    on_unchanged: Callable[[Path], Any] = None,
+) -> Callable[[Path, Path], Optional[int]]:
+    """Wrap a transfer function to skip unchanged files and to plan without transferring.
+
+    Args:
+        transfer (Callable[[Path, Path], int]): function copying or moving one file and returning its size.
+        update (bool, optional): skip files whose destination is unchanged. Defaults to False.
+        verify (bool, optional): compare contents instead of modification times. Defaults to False.
+        dry_run (bool, optional): only report what would be transferred. Defaults to False.
+        on_unchanged (Callable[[Path], Any], optional): called with the source of a skipped file proven identical to its
+            destination, by its contents with verify or else by the same size and modification time. Defaults to None.
+
+    Returns:
+        Callable[[Path, Path], Optional[int]]: transfer function returning None for skipped files.
+    """
+    if not (update or dry_run):
+        return transfer
+
+    def run(src: Path, dst: Path) -> Optional[int]:
+        if update and _is_unchanged(src, dst, verify=verify):
+            if (
+                on_unchanged is not None
+                and not dry_run
+                and (verify or _has_same_mtime(src, dst))
+            ):
+                on_unchanged(src)
+            return None
+        if dry_run:
+            return os.stat(src).st_size
+        return transfer(src, dst)
+
+    return run
+
+
+def _run_transfers(
+    transfer: Callable[[Path, Path], Optional[int]],
+    jobs: Iterable[tuple[Union[str, Path], Union[str, Path]]],
+    workers: int = None,
+    ignore_errors: bool = False,
+    dry_run: bool = False,
+) -> TransferResult:
+    """Run transfer(src, dst) for every job, optionally on a pool of threads.
+
+    Jobs are consumed lazily and at most a few per worker are in flight, so memory
+    stays flat for any number of files.
+
+    Args:
+        transfer (Callable[[Path, Path], Optional[int]]): function copying or moving one file and returning its size, or None if skipped.
+        jobs (Iterable[tuple[Union[str, Path], Union[str, Path]]]): source and destination file paths.
+        workers (int, optional): number of threads. Defaults to None(serial).
+        ignore_errors (bool, optional): record failures in the result instead of raising the first one. Defaults to False.
+        dry_run (bool, optional): record the transferred pairs as planned. Defaults to False.
+
+    Returns:
+        TransferResult: summary of the transfer.
+    """
+    result = TransferResult()
+    start = time.perf_counter()
+
+    def record(job: tuple[Path, Path], run: Callable[[], Optional[int]]):
+        try:
+            size = run()
+        except OSError as e:
+            if not ignore_errors:
+                raise
+            result.failures.append((job[0], e))
+            return
+        if size is None:
+            result.skipped += 1
+            return
+        result.bytes += size
+        result.files += 1
+        if dry_run:
+            result.planned.append((Path(job[0]), Path(job[1])))
+
+    if not workers or workers <= 1:
+        for job in jobs:
+            record(job, lambda: transfer(*job))
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = {}
+            try:
+                for job in jobs:
+                    if len(pending) >= workers * 4:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            record(pending.pop(future), future.result)
+                    pending[executor.submit(transfer, *job)] = job
+                for future in as_completed(pending):
+                    record(pending[future], future.result)
+            except BaseException:
+                for future in pending:
+                    future.cancel()
+                raise
+
+    result.seconds = time.perf_counter() - start
+    return result
+
+
 def copy_files_to_directory(
     src: Union[list, str, PurePath],
     dst: Union[str, PurePath],
@@ -93,7 +1586,13 @@ def copy_files_to_directory(
     extension: Union[str, list] = None,
     include_directories: bool = False,
     create_directory: bool = False,
-):
+    workers: int = None,
+    ignore_errors: bool = False,
+    update: bool = False,
+    verify: bool = False,
+    dry_run: bool = False,
+    strategy: str = "copy",
+) -> TransferResult:
     """Copy files to directory
 
     Args:
@@ -103,66 +1602,86 @@ def copy_files_to_directory(
         extension (Union[str, list], optional): copy only specific extension(including "."). Defaults to None.
         include_directories (bool, optional): Whether to include directories in the list or not. Defaults to False.
         create_directory (bool, optional): create destination directory or not. Defaults to False.
+        workers (int, optional): number of threads copying files concurrently. Defaults to None(serial).
+        ignore_errors (bool, optional): record failed files in the result instead of raising. Defaults to False.
+        update (bool, optional): copy only new or changed files. A destination file with the same size and a modification time
+            not older than its source is skipped, and copied files keep the modification time of their source. Defaults to False.
+        verify (bool, optional): with update, compare contents instead of modification times. Defaults to False.
+        dry_run (bool, optional): plan the copy without touching the destination. Defaults to False.
+        strategy (str, optional): how files are placed, one of "copy", "hardlink", "symlink", "reflink" and "auto".
+            "auto" tries reflink, then hardlink, then falls back to copy, e.g. across filesystems.
+            Hardlinked files share their contents with the source. Defaults to "copy".
 
     Raises:
         FileNotFoundError: if src is unknown
-        ValueError: if dst is not directory format
+        ValueError: if dst is not directory format or strategy is unknown
         FileNotFoundError: if dst is not exists. you can bypass this error with create_directory argument.
-    """
-    if not isinstance(src, list):
-        src = [src]
-    src = [Path(src_path).absolute() for src_path in src]
 
-    src_list = []
-    for src_path in src:
-        if Path(src_path).is_file():
-            src_list.append(Path(src_path))
-        elif Path(src_path).is_dir():
-            src_list.extend(
-                search.get_files(
-                    src_path,
-                    recursive=recursive,
-                    extension=extension,
-                    include_directories=include_directories,
-                )
-            )
-        else:
-            raise FileNotFoundError(f"{src_path} does not exists")
-
-    if len(src_list) == 1:
-        src_prefix = src_list[0].parent
-    elif len(src_list) > 1:
-        src_prefix = Path(os.path.commonpath(src_list))
-    else:
-        raise FileNotFoundError("src_list is empty")
+    Returns:
+        TransferResult: number of files and bytes copied, skipped files, elapsed time and failures.
+    """
+    _check_strategy(strategy)
+    src_prefix, src_list = _iter_sources(
+        src,
+        recursive=recursive,
+        extension=extension,
+        include_directories=include_directories,
+        exclude=dst,
+    )
 
     dst = Path(dst)
 
     if dst.exists() and dst.is_file():
         raise ValueError(f"dst should be directory. {dst} is not directory.")
 
-    if create_directory:
+    if create_directory and not dry_run:
         make_directory(dst)
 
-    if not dst.exists():
+    if not dst.exists() and not (create_directory and dry_run):
         raise FileNotFoundError(
             f"{dst} directory does not exist. please set 'create_directory' argument to be True to make directory."
         )
 
-    for src_file in src_list:
-        if src_file.is_file():
-            dst_file = Path(str(src_file).replace(str(src_prefix), str(dst)))
-            make_directory(dst_file.parent)
-            shutil.copy(src_file, dst_file)
-        elif src_file.is_dir():
-            dst_file = Path(str(src_file).replace(str(src_prefix), str(dst)))
-            make_directory(dst_file)
+    # in a dry run every directory counts as created
+    created = {str(dst)}
+    mapping = _PathMapper(src_prefix, dst)
+
+    def jobs() -> Iterator[tuple[Path, str]]:
+        for src_file in src_list:
+            dst_file = mapping(src_file)
+            if src_file.is_file():
+                dst_parent = os.path.dirname(dst_file)
+                if dst_parent not in created and not dry_run:
+                    make_directory(dst_parent)
+                    created.add(dst_parent)
+                yield src_file, dst_file
+            elif src_file.is_dir() and dst_file not in created:
+                if not dry_run:
+                    make_directory(dst_file)
+                created.add(dst_file)
+
+    transfer = _incremental(
+        functools.partial(
+            _place_file, strategy=strategy, preserve_times=update
+        ),
+        update=update,
+        verify=verify,
+        dry_run=dry_run,
+    )
+    return _run_transfers(
+        transfer,
+        jobs(),
+        workers=workers,
+        ignore_errors=ignore_errors,
+        dry_run=dry_run,
+    )
 
 
 def copy_file(
     src: Union[str, Path],
     dst: Union[str, Path],
     create_directory: bool = False,
+    strategy: str = "copy",
 ):
     """Copy file
 
@@ -170,15 +1689,22 @@ def copy_file(
         src (Union[str, Path]): source file path.
         dst (Union[str, Path]): destination file path.
         create_directory (bool, optional): create destination directory or not. Defaults to False.
+        strategy (str, optional): how the file is placed, one of "copy", "hardlink", "symlink", "reflink" and "auto".
+            "auto" tries reflink, then hardlink, then falls back to copy. Defaults to "copy".
 
     Raises:
+        ValueError: if strategy is unknown
     """
+    _check_strategy(strategy)
     dst = Path(dst)
 
     if create_directory:
         make_directory(dst.parent)
 
-    shutil.copy(src, dst)
+    if dst.is_dir():
+        dst = dst / Path(src).name
+
+    _place_file(src, dst, strategy=strategy)
 
 
 def make_directory(src: Union[str, Path]):
@@ -199,19 +1725,151 @@ def remove_file(src: str):
     os.remove(src)
 
 
-def remove_directory(src: Union[str, Path], recursive: bool = False):
+def _clear_directory(directory: str) -> list[str]:
+    """Remove the files of a directory and return its subdirectories."""
+    subdirectories = []
+    try:
+        with os.scandir(directory) as it:
+            entries = list(it)
+    except FileNotFoundError:
+        return subdirectories
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            subdirectories.append(entry.path)
+            continue
+        try:
+            os.unlink(entry.path)
+        except FileNotFoundError:
+            pass
+    return subdirectories
+
+
+def _remove_tree(directory: str, workers: int = None):
+    """Remove a directory tree, clearing directories on a pool of threads.
+
+    Files are removed by the threads, directory by directory as they are found, then
+    the emptied directories are removed deepest first.
+    """
+    if not workers:
+        shutil.rmtree(directory)
+        return
+
+    directories = [directory]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {executor.submit(_clear_directory, directory)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                for subdirectory in future.result():
+                    directories.append(subdirectory)
+                    pending.add(
+                        executor.submit(_clear_directory, subdirectory)
+                    )
+
+    for subdirectory in sorted(
+        directories, key=lambda path: path.count(os.sep), reverse=True
+    ):
+        os.rmdir(subdirectory)
+
+
+def remove_directory(
+    src: Union[str, Path],
+    recursive: bool = False,
+    workers: int = None,
+    background: bool = False,
+) -> Optional[threading.Thread]:
     """Remove Directory
 
+    With background, the directory is first renamed to a hidden trash directory next
+    to it, so it disappears at once, and the trash is removed by a thread. The thread
+    is not a daemon, so the interpreter waits for it to finish before exiting.
+
     Args:
         src (str): file to remove
         recursive (bool, optional): remove recursively. Defaults to False.
+        workers (int, optional): number of threads removing files, which pays off for very large trees. Defaults to None(serial).
+        background (bool, optional): return immediately and remove the directory in a thread. Defaults to False.
+
+    Raises:
+        FileExistsError: if src is not empty and recursive is False
+        OSError: if src is a symbolic link and recursive is True
+
+    Returns:
+        Optional[threading.Thread]: the thread removing the directory if background, None otherwise.
     """
     if not recursive:
-        if Path(src).glob("**/*"):
+        if not search.is_empty(src):
             raise FileExistsError(
                 f"{src} is not empty. please set recursive argument to be True to remove directory."
             )
-    shutil.rmtree(src)
+        os.rmdir(src)
+        return None
+
+    # like shutil.rmtree, never follow a link into a tree that is not src
+    if os.path.islink(src):
+        raise OSError(f"Cannot call rmtree on a symbolic link: {src}")
+
+    if not background:
+        _remove_tree(str(src), workers=workers)
+        return None
+
+    src = Path(src).absolute()
+    trash = src.with_name(
+        f".{src.name}.{os.getpid()}.{os.urandom(4).hex()}.trash"
+    )
+    os.rename(src, trash)
+    thread = threading.Thread(
+        target=_remove_tree,
+        args=(str(trash),),
+        kwargs={"workers": workers},
+        name=f"remove_directory({src})",
+    )
+    thread.start()
+    return thread
+
+
+def _rename_file(src: Union[str, Path], dst: Union[str, Path]) -> int:
+    size = os.lstat(src).st_size
+    try:
+        os.replace(src, dst)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        # a mount point inside the source tree
+        return _copy_and_unlink_file(src, dst)
+    return size
+
+
+def _copy_and_unlink_file(
+    src: Union[str, Path], dst: Union[str, Path], verify: bool = False
+) -> int:
+    """Move a file across devices: copy it, verify the copy, then remove the source.
+
+    Args:
+        src (Union[str, Path]): source file path.
+        dst (Union[str, Path]): destination file path.
+        verify (bool, optional): compare contents too, not only the size. Defaults to False.
+
+    Raises:
+        OSError: if the copy does not match the source, which is then kept.
+
+    Returns:
+        int: size of the file.
+    """
+    if os.path.islink(src):
+        if os.path.lexists(dst):
+            os.unlink(dst)
+        os.symlink(os.readlink(src), dst)
+        os.unlink(src)
+        return 0
+
+    size = _place_file(src, dst, preserve_times=True)
+    if os.stat(dst).st_size != os.stat(src).st_size or (
+        verify and checksum.hash_file(src) != checksum.hash_file(dst)
+    ):
+        raise OSError(errno.EIO, f"copy of {src} does not match", str(dst))
+    os.unlink(src)
+    return size
 
 
 def move_files_to_directory(
@@ -221,9 +1879,18 @@ def move_files_to_directory(
     extension: Union[str, list] = None,
     include_directories: bool = False,
     create_directory: bool = False,
-):
+    update: bool = False,
+    verify: bool = False,
+    dry_run: bool = False,
+    workers: int = None,
+) -> TransferResult:
     """Move files
 
+    Moves within a device are renames. When a directory is moved recursively without
+    an extension filter, every subdirectory missing from the destination is moved with
+    a single rename of the whole subtree. Moves across devices copy each file, verify
+    the copy and remove the source, optionally on a pool of threads.
+
     Args:
         src (Union[list, str, PurePath]): 'file list' or 'file' or 'directory' or 'directory list'.
         dst (Union[str, PurePath]): destination directory.
@@ -231,59 +1898,213 @@ def move_files_to_directory(
         extension (Union[str, list], optional): move only specific extension(including "."). Defaults to None.
         include_directories (bool, optional): Whether to include directories in the list or not. Defaults to False.
         create_directory (bool, optional): create destination directory or not. Defaults to False.
+        update (bool, optional): move only new or changed files. A destination file with the same size and a modification
+            time not older than its source is kept. The source is then removed only if the destination is a copy of it, with
+            the same modification time, or the same contents with verify, and is left in place otherwise. Defaults to False.
+        verify (bool, optional): with update, compare contents instead of modification times. Copies made across
+            devices are compared with their source before it is removed, too. Defaults to False.
+        dry_run (bool, optional): plan the move without touching the source or the destination. Defaults to False.
+        workers (int, optional): number of threads moving files concurrently. Defaults to None(serial).
 
     Raises:
         FileNotFoundError: if src is unknown
         ValueError: if dst is not directory format
         FileNotFoundError: if dst is not exists. you can bypass this error with create_directory argument.
-    """
-    if not isinstance(src, list):
-        src = [src]
-    src = [Path(src_path).absolute() for src_path in src]
 
-    src_list = []
-    for src_path in src:
-        if Path(src_path).is_file():
-            src_list.append(Path(src_path))
-        elif Path(src_path).is_dir():
-            src_list.extend(
-                search.get_files(
-                    src_path,
-                    recursive=recursive,
-                    extension=extension,
-                    include_directories=include_directories,
-                )
-            )
-        else:
-            raise FileNotFoundError(f"{src_path} does not exists")
-
-    if len(src_list) == 1:
-        src_prefix = src_list[0].parent
-    elif len(src_list) > 1:
-        src_prefix = Path(os.path.commonpath(src_list))
-    else:
-        raise FileNotFoundError("src_list is empty")
+    Returns:
+        TransferResult: number of files and bytes moved one by one, subtrees moved by a single rename,
+            skipped files and elapsed time.
+    """
+    src_prefix, src = _resolve_sources(src)
 
     dst = Path(dst)
 
     if dst.exists() and dst.is_file():
         raise ValueError(f"dst should be directory. {dst} is not directory.")
 
-    if create_directory:
+    if create_directory and not dry_run:
         make_directory(dst)
 
-    if not dst.exists():
+    if not dst.exists() and not (create_directory and dry_run):
         raise FileNotFoundError(
             f"{dst} directory does not exist. please set 'create_directory' argument to be True to make directory."
         )
 
-    for src_file in src_list:
-        dst_file = Path(str(src_file).replace(str(src_prefix), str(dst)))
-        if src_file.is_file():
-            make_directory(dst_file.parent)
-            shutil.move(src_file, dst_file)
-        elif src_file.is_dir() and not dst_file.exists():
-            shutil.move(src_file, dst_file)
+    mapping = _PathMapper(src_prefix, dst)
+    same_device = dst.exists() and all(
+        os.stat(src_path).st_dev == os.stat(dst).st_dev for src_path in src
+    )
+    renamed = 0
+
+    def file_jobs() -> Iterator[tuple[Path, str]]:
+        src_list = _iter_sources(
+            src,
+            recursive=recursive,
+            extension=extension,
+            include_directories=include_directories,
+            exclude=dst,
+        )[1]
+        for src_file in src_list:
+            dst_file = mapping(src_file)
+            if src_file.is_file():
+                if not dry_run:
+                    make_directory(os.path.dirname(dst_file))
+                yield src_file, dst_file
+            elif (
+                src_file.is_dir()
+                and not os.path.exists(dst_file)
+                and not dry_run
+            ):
+                shutil.move(src_file, dst_file)
+
+    def tree_jobs() -> Iterator[tuple[str, str]]:
+        nonlocal renamed
+        if all(
+            src_path.is_dir() and search.is_empty(src_path) for src_path in src
+        ):
+            raise FileNotFoundError("src_list is empty")
+
+        # dst may be inside src: it is skipped and its ancestors are walked into
+        dst_path = os.path.abspath(dst)
+        dst_ancestors = set(map(str, Path(dst_path).parents))
+
+        stack = []
+        for src_path in src:
+            if src_path.is_file():
+                dst_file = mapping(src_path)
+                make_directory(os.path.dirname(dst_file))
+                yield str(src_path), dst_file
+            else:
+                stack.append((os.path.abspath(src_path), mapping(src_path)))
+
+        while stack:
+            src_dir, dst_dir = stack.pop()
+            make_directory(dst_dir)
+            with os.scandir(src_dir) as it:
+                entries = list(it)
+            for entry in entries:
+                target = os.path.join(dst_dir, entry.name)
+                if not entry.is_dir(follow_symlinks=False):
+                    yield entry.path, target
+                    continue
+                if entry.path == dst_path:
+                    continue
+                if entry.path in dst_ancestors:
+                    stack.append((entry.path, target))
+                    continue
+                if not os.path.lexists(target):
+                    try:
+                        os.rename(entry.path, target)
+                        renamed += 1
+                        continue
+                    except OSError as e:
+                        # a mount point inside the source tree
+                        if e.errno != errno.EXDEV:
+                            raise
+                stack.append((entry.path, target))
+
+    if same_device:
+        move = _rename_file
+    else:
+        move = functools.partial(_copy_and_unlink_file, verify=verify)
+    transfer = _incremental(
+        move,
+        update=update,
+        verify=verify,
+        dry_run=dry_run,
+        on_unchanged=os.remove,
+    )
+
+    if same_device and recursive and not extension and not dry_run:
+        jobs = tree_jobs()
+    else:
+        jobs = file_jobs()
+    result = _run_transfers(transfer, jobs, workers=workers, dry_run=dry_run)
+    result.directories = renamed
+    return result
+
+
+def _zip_compress_type(path: Path, compress_type: int) -> int:
+    if path.suffix.lower() in COMPRESSED_EXTENSIONS:
+        return zipfile.ZIP_STORED
+    return compress_type
+
+
+def _compress_member(
+    src: Path,
+    arcname: str,
+    compress_type: int,
+    compresslevel: Optional[int],
+) -> tuple[zipfile.ZipInfo, bytes]:
+    """Read and compress one file into a zip member, off the writer thread.
+
+    Args:
+        src (Path): source file path.
+        arcname (str): name of the member in the archive.
+        compress_type (int): zipfile compression constant.
+        compresslevel (Optional[int]): compression level, or None for the codec default.
+
+    Returns:
+        tuple[zipfile.ZipInfo, bytes]: member header info and compressed data.
+    """
+    zinfo = zipfile.ZipInfo.from_file(src, arcname)
+    zinfo.compress_type = compress_type
+    if compress_type == zipfile.ZIP_LZMA:
+        # the lzma properties are written at the start of the data
+        zinfo.flag_bits |= 0x02
+
+    with open(src, "rb") as f:
+        data = f.read()
+    zinfo.file_size = len(data)
+    zinfo.CRC = zlib.crc32(data)
+
+    # the same compressor objects ZipFile.write uses
+    compressor = zipfile._get_compressor(compress_type, compresslevel)
+    if compressor is not None:
+        data = compressor.compress(data) + compressor.flush()
+    zinfo.compress_size = len(data)
+    return zinfo, data
+
+
+def _supports_member_writes(f: zipfile.ZipFile) -> bool:
+    """Check if the private zipfile API used by the parallel writer is available.
+
+    zipfile has no public API to add precompressed data, so _compress_member and
+    _write_member use internals that exist on every supported Python but carry
+    no compatibility promise. Without them, zip falls back to ZipFile.write.
+    """
+    return (
+        callable(getattr(zipfile, "_get_compressor", None))
+        and callable(getattr(f, "_writecheck", None))
+        and all(
+            hasattr(f, name)
+            for name in (
+                "fp",
+                "filelist",
+                "NameToInfo",
+                "_didModify",
+                "start_dir",
+            )
+        )
+    )
+
+
+def _write_member(
+    f: zipfile.ZipFile, zinfo: zipfile.ZipInfo, data: bytes
+) -> None:
+    """Append an already compressed member to a zip file opened for writing."""
+    zip64 = (
+        zinfo.file_size > zipfile.ZIP64_LIMIT
+        or zinfo.compress_size > zipfile.ZIP64_LIMIT
+    )
+    zinfo.header_offset = f.fp.tell()
+    f._writecheck(zinfo)
+    f._didModify = True
+    f.fp.write(zinfo.FileHeader(zip64))
+    f.fp.write(data)
+    f.filelist.append(zinfo)
+    f.NameToInfo[zinfo.filename] = zinfo
+    f.start_dir = f.fp.tell()
 
 
 def zip(
@@ -292,42 +2113,41 @@ def zip(
     recursive: bool = True,
     extension: Union[str, list] = None,
     create_directory: bool = False,
+    compression: str = "deflate",
+    compresslevel: int = None,
+    workers: int = None,
 ) -> str:
     """Zip file(s) or directory(s)
 
+    Files which are already compressed (jpg, png and videos) are stored as is. With
+    workers, members are compressed on a pool of threads and written in order, if
+    the zipfile internals this relies on are available.
+
     Args:
         src (Union[str, PurePath, list]): file(s) or directory(s)
         dst (str): destination file path
         recursive (bool, optional): zip recursively or not when zipping directory. Defaults to True.
         extension (Union[str, list], optional): zip only specific extension(including "."). Defaults to None.
         create_directory (bool, optional): create destination directory or not. Defaults to False.
+        compression (str, optional): one of "stored", "deflate", "bzip2" or "lzma". Defaults to "deflate".
+        compresslevel (int, optional): compression level of the codec. Defaults to None(codec default).
+        workers (int, optional): number of threads compressing members. Defaults to None(serial).
+
+    Raises:
+        ValueError: if compression is unknown
 
     Returns:
         str: destination file path
     """
-    if not isinstance(src, list):
-        src = [src]
-    src = [Path(src_path).absolute() for src_path in src]
-
-    src_list = []
-    for src_path in src:
-        if Path(src_path).is_file():
-            src_list.append(Path(src_path))
-        elif Path(src_path).is_dir():
-            src_list.extend(
-                search.get_files(
-                    src_path, recursive=recursive, extension=extension
-                )
-            )
-        else:
-            raise FileNotFoundError(f"{src_path} does not exists")
+    if compression not in ZIP_COMPRESSIONS:
+        raise ValueError(
+            f"compression should be one of {list(ZIP_COMPRESSIONS)}, not {compression}"
+        )
+    compress_type = ZIP_COMPRESSIONS[compression]
 
-    if len(src_list) == 1:
-        src_prefix = src_list[0].parent
-    elif len(src_list) > 1:
-        src_prefix = Path(os.path.commonpath(src_list))
-    else:
-        raise FileNotFoundError("src_list is empty")
+    src_prefix, src_list = _iter_sources(
+        src, recursive=recursive, extension=extension, exclude=Path(dst).parent
+    )
 
     if create_directory:
         make_directory(Path(dst).parent)
@@ -337,24 +2157,138 @@ def zip(
             f"{dst} directory does not exist. please set 'create_directory' argument to be True to make directory."
         )
 
+    mapping = _PathMapper(src_prefix)
     with zipfile.ZipFile(dst, "w") as f:
-        for src_file in src_list:
-            f.write(
-                src_file,
-                arcname=str(src_file.relative_to(src_prefix)),
-                compress_type=zipfile.ZIP_DEFLATED,
-            )
+        if not workers or not _supports_member_writes(f):
+            for src_file in src_list:
+                f.write(
+                    src_file,
+                    arcname=mapping.relative(src_file),
+                    compress_type=_zip_compress_type(src_file, compress_type),
+                    compresslevel=compresslevel,
+                )
+            return str(dst)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            for src_file in src_list:
+                arcname = mapping.relative(src_file)
+                member_type = _zip_compress_type(src_file, compress_type)
+                if os.stat(src_file).st_size > _ZIP_PARALLEL_LIMIT:
+                    while pending:
+                        _write_member(f, *pending.popleft().result())
+                    f.write(
+                        src_file,
+                        arcname=arcname,
+                        compress_type=member_type,
+                        compresslevel=compresslevel,
+                    )
+                    continue
+
+                pending.append(
+                    executor.submit(
+                        _compress_member,
+                        src_file,
+                        arcname,
+                        member_type,
+                        compresslevel,
+                    )
+                )
+                if len(pending) >= workers * 2:
+                    _write_member(f, *pending.popleft().result())
+            while pending:
+                _write_member(f, *pending.popleft().result())
 
     return str(dst)
 
 
-def unzip(src: str, dst: str, create_directory: bool = False) -> str:
+def _zip_member_filter(
+    extension: Union[str, list] = None,
+    pattern: Union[str, list] = None,
+    prefix: Union[str, list] = None,
+) -> Optional[Callable[[zipfile.ZipInfo], bool]]:
+    """Build a predicate selecting zip members, or None to select every member.
+
+    Args:
+        extension (Union[str, list], optional): member extension(s)(including "."). Defaults to None.
+        pattern (Union[str, list], optional): glob(s) matched against the whole member name. Defaults to None.
+        prefix (Union[str, list], optional): member name prefix(es), e.g. "annotations/". Defaults to None.
+
+    Returns:
+        Optional[Callable[[zipfile.ZipInfo], bool]]: predicate selecting file members.
+    """
+    if not (extension or pattern or prefix):
+        return None
+
+    extension_filter = search.ExtensionFilter(extension)
+    if isinstance(pattern, str):
+        pattern = [pattern]
+    match = (
+        re.compile("|".join(map(fnmatch.translate, pattern))).match
+        if pattern
+        else None
+    )
+    prefix = (prefix,) if isinstance(prefix, str) else tuple(prefix or ())
+
+    def select(info: zipfile.ZipInfo) -> bool:
+        name = info.filename
+        return (
+            not info.is_dir()
+            and extension_filter.match_extension(name.rpartition("/")[2])
+            and (match is None or match(name) is not None)
+            and (not prefix or name.startswith(prefix))
+        )
+
+    return select
+
+
+def iter_zip_members(
+    src: Union[str, PurePath],
+    extension: Union[str, list] = None,
+    pattern: Union[str, list] = None,
+    prefix: Union[str, list] = None,
+) -> Iterator[tuple[str, bytes]]:
+    """Read zip members into memory one by one, without writing them to disk.
+
+    Args:
+        src (Union[str, PurePath]): source file path
+        extension (Union[str, list], optional): read only specific extension(including "."). Defaults to None.
+        pattern (Union[str, list], optional): read only members whose name matches a glob. Defaults to None.
+        prefix (Union[str, list], optional): read only members whose name starts with a prefix. Defaults to None.
+
+    Yields:
+        tuple[str, bytes]: member name and data.
+    """
+    select = _zip_member_filter(extension, pattern, prefix)
+    with zipfile.ZipFile(src, "r") as f:
+        for info in f.infolist():
+            if info.is_dir() or (select is not None and not select(info)):
+                continue
+            yield info.filename, f.read(info)
+
+
+def unzip(
+    src: str,
+    dst: str,
+    create_directory: bool = False,
+    extension: Union[str, list] = None,
+    pattern: Union[str, list] = None,
+    prefix: Union[str, list] = None,
+    workers: int = None,
+) -> str:
     """Unzip file
 
+    With workers, members are extracted on a pool of threads, each with its own
+    handle on the zip file.
+
     Args:
         src (str): source file path
         dst (str): destination directory
         create_directory (bool, optional): create destination directory or not. Defaults to False.
+        extension (Union[str, list], optional): extract only specific extension(including "."). Defaults to None.
+        pattern (Union[str, list], optional): extract only members whose name matches a glob, e.g. "train/*.jpg". Defaults to None.
+        prefix (Union[str, list], optional): extract only members whose name starts with a prefix, e.g. "annotations/". Defaults to None.
+        workers (int, optional): number of threads extracting members. Defaults to None(serial).
 
     Returns:
         str: destination directory
@@ -363,7 +2297,399 @@ def unzip(src: str, dst: str, create_directory: bool = False) -> str:
     if create_directory:
         make_directory(dst)
 
+    select = _zip_member_filter(extension, pattern, prefix)
     with zipfile.ZipFile(src, "r") as f:
-        f.extractall(dst)
+        members = f.infolist()
+        if select is not None:
+            members = list(filter(select, members))
+        if not workers:
+            f.extractall(dst, members=members)
+            return str(dst)
+
+    local = threading.local()
+    handles = []
+
+    def extract(info: zipfile.ZipInfo) -> None:
+        handle = getattr(local, "handle", None)
+        if handle is None:
+            handle = local.handle = zipfile.ZipFile(src, "r")
+            handles.append(handle)
+        try:
+            handle.extract(info, dst)
+        except FileExistsError:
+            # another worker created the same parent directory meanwhile
+            handle.extract(info, dst)
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for _ in executor.map(extract, members):
+                pass
+    finally:
+        for handle in handles:
+            handle.close()
 
     return str(dst)
+
+
+def _archive_format(fp: Union[str, PurePath], format: str = None) -> str:
+    if format is not None:
+        if format not in ARCHIVE_FORMATS.values():
+            raise ValueError(
+                f"format should be one of {sorted(set(ARCHIVE_FORMATS.values()))}, not {format}"
+            )
+        return format
+    name = str(fp).lower()
+    for suffix, format in ARCHIVE_FORMATS.items():
+        if name.endswith(suffix):
+            return format
+    raise ValueError(
+        f"cannot infer the archive format of {fp}, use one of {list(ARCHIVE_FORMATS)} or set format"
+    )
+
+
+def _require_zstandard():
+    if zstandard is None:
+        raise ImportError(
+            "zstandard is required for .tar.zst archives. install it with 'pip install zstandard'."
+        )
+
+
+def archive(
+    src: Union[str, PurePath, list],
+    dst: Union[str, PurePath],
+    recursive: bool = True,
+    extension: Union[str, list] = None,
+    create_directory: bool = False,
+    format: str = None,
+    compresslevel: int = None,
+) -> str:
+    """Archive file(s) or directory(s) into a tar, tar.gz or tar.zst file
+
+    Files are added one by one while the sources are walked and the archive is
+    written as a stream, so memory stays flat for any number of files.
+
+    Args:
+        src (Union[str, PurePath, list]): file(s) or directory(s)
+        dst (Union[str, PurePath]): destination file path
+        recursive (bool, optional): archive recursively or not when archiving directory. Defaults to True.
+        extension (Union[str, list], optional): archive only specific extension(including "."). Defaults to None.
+        create_directory (bool, optional): create destination directory or not. Defaults to False.
+        format (str, optional): "tar", "gz" or "zst". Defaults to None(inferred from dst).
+        compresslevel (int, optional): compression level of gz or zst. Defaults to None(codec default).
+
+    Raises:
+        ValueError: if the format is unknown
+        ImportError: if format is "zst" and zstandard is not installed
+
+    Returns:
+        str: destination file path
+    """
+    format = _archive_format(dst, format)
+    if format == "zst":
+        _require_zstandard()
+
+    src_prefix, src_list = _iter_sources(
+        src, recursive=recursive, extension=extension, exclude=Path(dst).parent
+    )
+
+    if create_directory:
+        make_directory(Path(dst).parent)
+
+    if not Path(dst).parent.exists():
+        raise FileNotFoundError(
+            f"{dst} directory does not exist. please set 'create_directory' argument to be True to make directory."
+        )
+
+    mapping = _PathMapper(src_prefix)
+    with open(dst, "wb") as f:
+        if format == "zst":
+            compressor = zstandard.ZstdCompressor(
+                level=3 if compresslevel is None else compresslevel
+            )
+            stream = compressor.stream_writer(f, closefd=False)
+        elif format == "gz":
+            # tarfile's "w|gz" takes no compresslevel before Python 3.12
+            stream = gzip.GzipFile(
+                fileobj=f,
+                mode="wb",
+                compresslevel=9 if compresslevel is None else compresslevel,
+            )
+        else:
+            stream = None
+        tar = tarfile.open(fileobj=f if stream is None else stream, mode="w|")
+
+        with tar:
+            for src_file in src_list:
+                tar.add(
+                    src_file,
+                    arcname=mapping.relative(src_file),
+                    recursive=False,
+                )
+        if stream is not None:
+            stream.close()
+
+    return str(dst)
+
+
+def _extract_member(
+    tar: tarfile.TarFile, member: tarfile.TarInfo, dst: Union[str, PurePath]
+):
+    if hasattr(tarfile, "data_filter"):
+        tar.extract(member, dst, filter="data")
+        return
+    # older interpreters without extraction filters
+    target = os.path.realpath(os.path.join(dst, member.name))
+    if os.path.commonpath([target, os.path.realpath(dst)]) != os.path.realpath(
+        dst
+    ) or not (member.isfile() or member.isdir()):
+        raise tarfile.ExtractError(f"refusing to extract {member.name}")
+    tar.extract(member, dst)
+
+
+def extract(
+    src: Union[str, PurePath, IO[bytes]],
+    dst: Union[str, PurePath],
+    create_directory: bool = False,
+    extension: Union[str, list] = None,
+    format: str = None,
+) -> str:
+    """Extract a tar, tar.gz or tar.zst file
+
+    The archive is read as a stream, so it can come straight from a pipe.
+
+    Args:
+        src (Union[str, PurePath, IO[bytes]]): source file path, a binary file object or "-" for stdin
+        dst (Union[str, PurePath]): destination directory
+        create_directory (bool, optional): create destination directory or not. Defaults to False.
+        extension (Union[str, list], optional): extract only specific extension(including "."). Defaults to None.
+        format (str, optional): "tar", "gz" or "zst". Defaults to None(detected from the data).
+
+    Raises:
+        ValueError: if the format is unknown
+        ImportError: if the archive is zstd compressed and zstandard is not installed
+
+    Returns:
+        str: destination directory
+    """
+    if format is not None:
+        format = _archive_format(src, format)
+
+    if create_directory:
+        make_directory(dst)
+
+    if src == "-":
+        src = sys.stdin.buffer
+    opened = isinstance(src, (str, PurePath))
+    f = open(src, "rb") if opened else src
+    # peeking at the magic number must not consume a pipe
+    wrapped = not hasattr(f, "peek")
+    if wrapped:
+        f = BufferedReader(f)
+    extension_filter = search._as_filter(extension)
+
+    try:
+        if format is None:
+            format = "zst" if f.peek(4)[:4] == _ZSTD_MAGIC else "tar"
+
+        if format == "zst":
+            _require_zstandard()
+            stream = zstandard.ZstdDecompressor().stream_reader(
+                f, closefd=False
+            )
+            tar = tarfile.open(fileobj=stream, mode="r|")
+        else:
+            # gzip and the other tarfile codecs are detected by tarfile
+            tar = tarfile.open(fileobj=f, mode="r|*")
+
+        with tar:
+            for member in tar:
+                if extension_filter is not None and (
+                    not member.isfile()
+                    or not extension_filter(member.name.rpartition("/")[2])
+                ):
+                    continue
+                _extract_member(tar, member, dst)
+    finally:
+        if opened:
+            f.close()
+        elif wrapped:
+            f.detach()
+
+    return str(dst)
+
+
+@dataclass
+class ManifestReport:
+    """Differences between a directory and its manifest, as relative paths."""
+
+    missing: list[str] = field(default_factory=list)
+    extra: list[str] = field(default_factory=list)
+    changed: list[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not (self.missing or self.extra or self.changed)
+
+
+def _manifest_files(
+    directory: Path,
+    manifest: Path,
+    recursive: bool,
+    extension: Union[str, list, None],
+    workers: Optional[int],
+) -> dict[str, tuple[Path, os.stat_result]]:
+    """List and stat the files of a directory, by relative path with "/" separators."""
+    default_manifest = directory / _MANIFEST_NAME
+    files = [
+        path
+        for path in search.get_files(
+            directory,
+            recursive=recursive,
+            extension=extension,
+            sort=False,
+            workers=workers,
+        )
+        if path != manifest and path != default_manifest
+    ]
+    if workers:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            stats = list(executor.map(os.stat, files))
+    else:
+        stats = list(map(os.stat, files))
+
+    mapping = _PathMapper(directory)
+    return {
+        mapping.relative(path).replace(os.sep, "/"): (path, stat)
+        for path, stat in builtins.zip(files, stats)
+    }
+
+
+def write_manifest(
+    directory: Union[str, Path],
+    manifest: Union[str, Path] = None,
+    recursive: bool = True,
+    extension: Union[str, list] = None,
+    algo: str = None,
+    workers: int = None,
+) -> str:
+    """write a manifest of the files of a directory
+
+    The manifest is a json lines file: a header with the listing options, then one
+    compact record per file with its relative path, size, mtime and, with algo, hash.
+    The manifest and any manifest.jsonl at the top of the directory are not listed.
+
+    Args:
+        directory (Union[str, Path]): directory to describe.
+        manifest (Union[str, Path], optional): manifest file path. Default to None(manifest.jsonl in directory).
+        recursive (bool, optional): include files of subdirectories. Default to True.
+        extension (Union[str, list], optional): include only specific extension(including "."). Default to None.
+        algo (str, optional): hash algorithm of checksum.hash_files, e.g. "blake2b". Default to None(no hashes).
+        workers (int, optional): number of threads listing, stating and hashing files. Default to None(serial).
+
+    Returns:
+        str: manifest file path
+    """
+
+    directory = Path(directory).absolute()
+    if not directory.is_dir():
+        raise FileNotFoundError(f"{directory} does not exists")
+    manifest = Path(manifest or directory / _MANIFEST_NAME).absolute()
+
+    files = _manifest_files(directory, manifest, recursive, extension, workers)
+    hashes = {}
+    if algo is not None:
+        hashes = checksum.hash_files(
+            [path for path, _ in files.values()], algo=algo, workers=workers
+        )
+
+    header = {
+        "version": MANIFEST_VERSION,
+        "recursive": recursive,
+        "extension": extension,
+        "algo": algo,
+    }
+    records = (
+        {
+            "path": relative,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            **({"hash": hashes[path]} if algo is not None else {}),
+        }
+        for relative, (path, stat) in sorted(files.items())
+    )
+    save_jsonl(itertools.chain([header], records), manifest)
+
+    return str(manifest)
+
+
+def verify_manifest(
+    directory: Union[str, Path],
+    manifest: Union[str, Path] = None,
+    check_mtime: bool = False,
+    check_hash: bool = True,
+    rehash: bool = False,
+    workers: int = None,
+) -> ManifestReport:
+    """compare a directory with a manifest written by write_manifest
+
+    Files are compared by size first, which catches truncated copies without reading
+    them. When the manifest has hashes, a file of the right size is only hashed if its
+    mtime differs from the manifest, so verifying an untouched directory or a copy
+    which preserved times reads no file data.
+
+    Args:
+        directory (Union[str, Path]): directory to verify.
+        manifest (Union[str, Path], optional): manifest file path. Default to None(manifest.jsonl in directory).
+        check_mtime (bool, optional): count files with another mtime as changed, for copies which preserve times. Default to False.
+        check_hash (bool, optional): compare hashes when the manifest has them. Default to True.
+        rehash (bool, optional): hash files even if their size and mtime match, to catch silent corruption. Default to False.
+        workers (int, optional): number of threads listing, stating and hashing files. Default to None(serial).
+
+    Returns:
+        ManifestReport: missing, extra and changed files.
+    """
+
+    directory = Path(directory).absolute()
+    if not directory.is_dir():
+        raise FileNotFoundError(f"{directory} does not exists")
+    manifest = Path(manifest or directory / _MANIFEST_NAME).absolute()
+
+    records = iter_jsonl(manifest)
+    header = next(records, None)
+    if not header or header.get("version") != MANIFEST_VERSION:
+        raise ValueError(f"{manifest} is not a manifest")
+    algo = header["algo"] if check_hash else None
+
+    files = _manifest_files(
+        directory, manifest, header["recursive"], header["extension"], workers
+    )
+
+    report = ManifestReport()
+    to_hash = {}
+    for record in records:
+        relative = record["path"]
+        found = files.pop(relative, None)
+        if found is None:
+            report.missing.append(relative)
+            continue
+        path, stat = found
+        if stat.st_size != record["size"] or (
+            check_mtime and stat.st_mtime_ns != record["mtime_ns"]
+        ):
+            report.changed.append(relative)
+        elif algo is not None and (
+            rehash or stat.st_mtime_ns != record["mtime_ns"]
+        ):
+            to_hash[path] = (relative, record["hash"])
+    report.extra = sorted(files)
+
+    if to_hash:
+        hashes = checksum.hash_files(list(to_hash), algo=algo, workers=workers)
+        report.changed.extend(
+            relative
+            for path, (relative, digest) in to_hash.items()
+            if hashes[path] != digest
+        )
+        report.changed.sort()
+
+    return report
@@ -1,7 +1,13 @@
+import fnmatch
+import hashlib
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Union
-
-from natsort import natsorted
+from typing import Callable, Iterable, Iterator, Optional, Union
 
 from waffle_utils.file.types import (
     SUPPORTED_IMAGE_EXTENSIONS,
@@ -19,16 +25,501 @@ def is_empty(directory: Union[str, Path]) -> bool:
     Returns:
         bool: True if the directory is empty, False otherwise.
     """
-    directory = Path(directory)
+    with os.scandir(directory) as it:
+        return next(it, None) is None
+
+
+SORT_MODES = ("natural", "lexical", "none", "mtime", "size")
+
+_DIGITS = re.compile(r"(\d+)")
+
+
+def _name_key(name: str) -> tuple:
+    parts = _DIGITS.split(name)
+    parts[1::2] = map(int, parts[1::2])
+    return tuple(parts)
+
+
+def natural_sorted(paths: Iterable[str]) -> list[str]:
+    """
+    Sort paths in natural order ("img2" before "img10").
+
+    The order is the default order of natsort.natsorted: each whole path is split
+    into text and numbers, so "b-1" sorts before "b/x" and "images.json" before
+    "images/a.png". Every directory prefix is parsed once and its key is shared by
+    all paths below it, so only the last component of each path is parsed per path.
+
+    Args:
+        paths (Iterable[str]): Paths to sort.
+
+    Returns:
+        list[str]: Sorted paths.
+    """
+    prefix_keys = {}
+
+    def path_key(path: str) -> tuple:
+        head, sep, name = path.rpartition(os.sep)
+        if not sep:
+            return _name_key(path)
+        key = prefix_keys.get(head)
+        if key is None:
+            key = prefix_keys[head] = path_key(head)
+        # keys start and end with text, which joins around the separator
+        name_key = _name_key(name)
+        return key[:-1] + (key[-1] + sep + name_key[0],) + name_key[1:]
+
+    return sorted(paths, key=path_key)
+
+
+def _sort_mode(sort: Union[str, bool]) -> str:
+    if sort is True:
+        return "natural"
+    if sort is False or sort is None:
+        return "none"
+    if sort not in SORT_MODES:
+        raise ValueError(f"sort should be one of {SORT_MODES}, but got {sort}")
+    return sort
+
+
+def _sort_paths(
+    paths: Iterable[str],
+    sort: Union[str, bool],
+    stats: Optional[dict[str, tuple[int, int]]] = None,
+) -> list[str]:
+    """
+    Sort paths by one of SORT_MODES.
+
+    Args:
+        paths (Iterable[str]): Paths to sort.
+        sort (Union[str, bool]): One of SORT_MODES. True means "natural" and False means "none".
+        stats (Optional[dict[str, tuple[int, int]]], optional): Known (size, mtime_ns) of the paths.
+            Paths are stat'ed for "mtime" and "size" if not given. Defaults to None.
+
+    Returns:
+        list[str]: Sorted paths. Ties keep their original order.
+    """
+    sort = _sort_mode(sort)
+    if sort == "natural":
+        return natural_sorted(paths)
+    if sort == "lexical":
+        return sorted(paths)
+    if sort == "none":
+        return list(paths)
+
+    index = 1 if sort == "mtime" else 0
+    if stats is None:
+
+        def key(path: str) -> int:
+            stat = os.stat(path)
+            return (stat.st_size, stat.st_mtime_ns)[index]
+
+    else:
+
+        def key(path: str) -> int:
+            return stats[path][index]
+
+    return sorted(paths, key=key)
+
+
+class ExtensionFilter:
+    """Precompiled file name matcher for extensions and glob/regex patterns.
+
+    Build it once and reuse it for every name of a listing. Extensions are matched
+    case-insensitively with a frozenset lookup, and multi-part suffixes such as
+    ".tar.gz" are supported. Include/exclude patterns are matched against the file
+    name only, so filtering never touches the filesystem.
+
+    Example:
+        >>> matcher = ExtensionFilter([".jpg", ".tar.gz"], exclude="*_mask.*")
+        >>> matcher("0001.JPG"), matcher("0001_mask.jpg"), matcher("shard.tar.gz")
+        (True, False, True)
+    """
+
+    def __init__(
+        self,
+        extension: Union[list[str], str, None] = None,
+        include: Union[list[str], str, None] = None,
+        exclude: Union[list[str], str, None] = None,
+        regex: bool = False,
+    ):
+        """
+        Args:
+            extension (Union[list[str], str, None], optional): File extension(including ".") to match. Defaults to None(any).
+            include (Union[list[str], str, None], optional): Patterns of which a name must match one. Defaults to None.
+            exclude (Union[list[str], str, None], optional): Patterns of which a name must match none. Defaults to None.
+            regex (bool, optional): Whether patterns are regular expressions or globs. Defaults to False(glob).
+        """
+        if isinstance(extension, str):
+            extension = [extension]
+        extension = [ext.lower() for ext in extension or []]
+        self.extension = frozenset(
+            ext for ext in extension if ext.count(".") == 1
+        )
+        self.multipart_extension = tuple(
+            ext for ext in extension if ext.count(".") > 1
+        )
+        self._any_extension = not extension
+
+        self.include = self._compile(include, regex)
+        self.exclude = self._compile(exclude, regex)
+
+    @staticmethod
+    def _compile(
+        patterns: Union[list[str], str, None], regex: bool
+    ) -> Optional[Callable[[str], Optional[re.Match]]]:
+        if not patterns:
+            return None
+        if isinstance(patterns, str):
+            patterns = [patterns]
+        if regex:
+            # regular expressions may match anywhere in the name, like re.search
+            pattern = "|".join(f"(?:{pattern})" for pattern in patterns)
+            return re.compile(pattern).search
+        # globs must match the whole name, like fnmatch
+        pattern = "|".join(fnmatch.translate(pattern) for pattern in patterns)
+        return re.compile(pattern).match
+
+    def match_extension(self, name: str) -> bool:
+        """
+        Check if a file name has one of the extensions.
+
+        Args:
+            name (str): File name.
+
+        Returns:
+            bool: True if the name has one of the extensions, False otherwise.
+        """
+        if self._any_extension:
+            return True
+
+        # a leading dot starts a hidden name, not an extension (same as Path.suffix)
+        index = name.rfind(".")
+        if index > 0:
+            suffix = name[index:]
+            if suffix in self.extension or suffix.lower() in self.extension:
+                return True
+        if self.multipart_extension:
+            name = name.lower()
+            return any(
+                len(name) > len(ext) and name.endswith(ext)
+                for ext in self.multipart_extension
+            )
+        return False
+
+    def __call__(self, name: str) -> bool:
+        """
+        Check if a file name passes the filter.
+
+        Args:
+            name (str): File name.
+
+        Returns:
+            bool: True if the name passes the filter, False otherwise.
+        """
+        if not self.match_extension(name):
+            return False
+        if self.include is not None and not self.include(name):
+            return False
+        if self.exclude is not None and self.exclude(name):
+            return False
+        return True
+
+
+IMAGE_EXTENSION_FILTER = ExtensionFilter(SUPPORTED_IMAGE_EXTENSIONS)
+VIDEO_EXTENSION_FILTER = ExtensionFilter(SUPPORTED_VIDEO_EXTENSION)
+
+
+def _as_filter(
+    extension: Union[list[str], str, ExtensionFilter, None]
+) -> Optional[ExtensionFilter]:
+    if isinstance(extension, ExtensionFilter):
+        return extension
+    if not extension:
+        return None
+    return ExtensionFilter(extension)
+
+
+def _scan_directory(
+    top: str,
+    files: bool = True,
+    directories: bool = False,
+    extension: Optional[ExtensionFilter] = None,
+    descend: bool = True,
+    sort: bool = False,
+) -> tuple[list[str], list[str]]:
+    """
+    List a single directory with os.scandir.
+
+    Entry types come from the d_type cached on each DirEntry, so regular files and
+    directories cost no extra stat. Like Path.glob("**/*"), symlinked directories are
+    matched but not descended into, and an unreadable directory lists as empty.
+
+    Args:
+        top (str): Path to the directory.
+        files (bool, optional): Whether to match files or not. Defaults to True.
+        directories (bool, optional): Whether to match directories or not. Defaults to False.
+        extension (Optional[ExtensionFilter], optional): Filter of file names to match. Defaults to None.
+        descend (bool, optional): Whether to collect subdirectories to walk into or not. Defaults to True.
+        sort (bool, optional): Whether to list the entries in natural order or not. Defaults to False.
+
+    Returns:
+        tuple[list[str], list[str]]: matched paths and subdirectories to walk into.
+    """
+    try:
+        with os.scandir(top) as it:
+            entries = list(it)
+    except OSError:
+        return [], []
+    if sort:
+        entries.sort(key=lambda entry: _name_key(entry.name))
+
+    matched = []
+    subdirectories = []
+    for entry in entries:
+        try:
+            is_dir = entry.is_dir()
+        except OSError:
+            is_dir = False
+
+        if is_dir:
+            if directories:
+                matched.append(entry.path)
+            if descend and not entry.is_symlink():
+                subdirectories.append(entry.path)
+        elif files and entry.is_file():
+            if extension is None or extension(entry.name):
+                matched.append(entry.path)
+
+    return matched, subdirectories
+
+
+def _walk(
+    directory: str,
+    recursive: bool = True,
+    files: bool = True,
+    directories: bool = False,
+    extension: Optional[ExtensionFilter] = None,
+    max_depth: Optional[int] = None,
+    sort: bool = False,
+) -> Iterator[str]:
+    """
+    Walk a directory depth-first and yield the paths of matching entries.
+
+    Each directory is listed completely before its entries are yielded, so callers
+    may move or remove yielded paths while walking.
+
+    Args:
+        directory (str): Path to the directory.
+        recursive (bool, optional): Whether to walk into subdirectories or not. Defaults to True.
+        files (bool, optional): Whether to yield files or not. Defaults to True.
+        directories (bool, optional): Whether to yield directories or not. Defaults to False.
+        extension (Optional[ExtensionFilter], optional): Filter of file names to yield. Defaults to None.
+        max_depth (Optional[int], optional): Maximum depth to walk, 1 being the entries of directory itself. Defaults to None.
+        sort (bool, optional): Whether to yield the entries of each directory in natural order or not. Defaults to False.
+
+    Yields:
+        str: Path of each matching entry.
+    """
+    if not recursive:
+        max_depth = 1
+
+    stack = [(directory, 1)]
+    while stack:
+        top, depth = stack.pop()
+        matched, subdirectories = _scan_directory(
+            top,
+            files=files,
+            directories=directories,
+            extension=extension,
+            descend=max_depth is None or depth < max_depth,
+            sort=sort,
+        )
+        yield from matched
+        stack.extend(
+            (subdirectory, depth + 1)
+            for subdirectory in reversed(subdirectories)
+        )
+
+
+def _walk_parallel(
+    directory: str,
+    workers: int,
+    recursive: bool = True,
+    files: bool = True,
+    directories: bool = False,
+    extension: Optional[ExtensionFilter] = None,
+) -> list[str]:
+    """
+    Walk a directory with a pool of threads, one directory listing per task.
+
+    Listing latency dominates on network filesystems (NFS, CIFS) and os.scandir
+    releases the GIL while waiting, so subdirectories are handed to the pool as soon
+    as they are found. The order of the result depends on scheduling.
+
+    Args:
+        directory (str): Path to the directory.
+        workers (int): Number of threads listing directories concurrently.
+        recursive (bool, optional): Whether to walk into subdirectories or not. Defaults to True.
+        files (bool, optional): Whether to collect files or not. Defaults to True.
+        directories (bool, optional): Whether to collect directories or not. Defaults to False.
+        extension (Optional[ExtensionFilter], optional): Filter of file names to collect. Defaults to None.
+
+    Returns:
+        list[str]: Paths of all matching entries.
+    """
+    result = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+
+        def submit(top: str):
+            return executor.submit(
+                _scan_directory,
+                top,
+                files=files,
+                directories=directories,
+                extension=extension,
+                descend=recursive,
+            )
+
+        pending = {submit(directory)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                matched, subdirectories = future.result()
+                result.extend(matched)
+                pending.update(map(submit, subdirectories))
+
+    return result
+
+
+def iter_files(
+    directory: Union[str, Path],
+    recursive: bool = True,
+    extension: Union[list[str], str, ExtensionFilter, None] = None,
+    include_directories: bool = False,
+    max_depth: Optional[int] = None,
+    sort: bool = True,
+) -> Iterator[Path]:
+    """
+    Lazily yields files in a directory as they are found, optionally filtered by extension.
+
+    Only one directory listing is held in memory at a time and the walk stops as soon as
+    the generator is closed or no longer consumed.
+
+    Args:
+        directory (Union[str, Path]): Path to the directory.
+        recursive (bool, optional): Whether to search recursively or not. Defaults to True.
+        extension (Union[list[str], str, ExtensionFilter, None], optional): File extension(including ".") or ExtensionFilter to filter the files by. Defaults to None.
+        include_directories (bool, optional): Whether to include directories or not. Defaults to False.
+        max_depth (Optional[int], optional): Maximum depth to search, 1 being the entries of directory itself. Defaults to None.
+        sort (bool, optional): Whether to yield the entries of each directory in natural order or not. Defaults to True.
+
+    Yields:
+        Path: File path.
+    """
+    for file in _walk(
+        str(directory),
+        recursive=recursive,
+        directories=include_directories,
+        extension=_as_filter(extension),
+        max_depth=max_depth,
+        sort=sort,
+    ):
+        yield Path(file)
+
+
+def iter_directories(
+    directory: Union[str, Path],
+    recursive: bool = True,
+    only_empty: bool = False,
+    max_depth: Optional[int] = None,
+    sort: bool = True,
+) -> Iterator[Path]:
+    """
+    Lazily yields directories in a directory as they are found, optionally only empty directories.
+
+    Args:
+        directory (Union[str, Path]): Path to the directory.
+        recursive (bool, optional): Whether to search recursively or not. Defaults to True.
+        only_empty (bool, optional): Only empty directories are yielded or not. Defaults to False.
+        max_depth (Optional[int], optional): Maximum depth to search, 1 being the entries of directory itself. Defaults to None.
+        sort (bool, optional): Whether to yield the entries of each directory in natural order or not. Defaults to True.
+
+    Yields:
+        Path: Directory path.
+    """
+    for sub_directory in _walk(
+        str(directory),
+        recursive=recursive,
+        files=False,
+        directories=True,
+        max_depth=max_depth,
+        sort=sort,
+    ):
+        if not only_empty or is_empty(sub_directory):
+            yield Path(sub_directory)
+
 
-    return not any(directory.iterdir())
+def iter_image_files(
+    directory: Union[str, Path],
+    recursive: bool = True,
+    max_depth: Optional[int] = None,
+    sort: bool = True,
+) -> Iterator[Path]:
+    """
+    Lazily yields image files in a directory as they are found.
+
+    Args:
+        directory (Union[str, Path]): Path to the directory.
+        recursive (bool, optional): Whether to search recursively or not. Defaults to True.
+        max_depth (Optional[int], optional): Maximum depth to search, 1 being the entries of directory itself. Defaults to None.
+        sort (bool, optional): Whether to yield the entries of each directory in natural order or not. Defaults to True.
+
+    Yields:
+        Path: Image file path.
+    """
+    return iter_files(
+        directory,
+        recursive=recursive,
+        extension=IMAGE_EXTENSION_FILTER,
+        max_depth=max_depth,
+        sort=sort,
+    )
+
+
+def iter_video_files(
+    directory: Union[str, Path],
+    recursive: bool = True,
+    max_depth: Optional[int] = None,
+    sort: bool = True,
+) -> Iterator[Path]:
+    """
+    Lazily yields video files in a directory as they are found.
+
+    Args:
+        directory (Union[str, Path]): Path to the directory.
+        recursive (bool, optional): Whether to search recursively or not. Defaults to True.
+        max_depth (Optional[int], optional): Maximum depth to search, 1 being the entries of directory itself. Defaults to None.
+        sort (bool, optional): Whether to yield the entries of each directory in natural order or not. Defaults to True.
+
+    Yields:
+        Path: Video file path.
+    """
+    return iter_files(
+        directory,
+        recursive=recursive,
+        extension=VIDEO_EXTENSION_FILTER,
+        max_depth=max_depth,
+        sort=sort,
+    )
 
 
 def get_files(
     directory: Union[str, Path],
     recursive: bool = True,
-    extension: Union[list[str], str, None] = None,
+    extension: Union[list[str], str, ExtensionFilter, None] = None,
     include_directories: bool = False,
+    sort: Union[str, bool] = "natural",
+    workers: Optional[int] = None,
 ) -> list[Path]:
     """
     Retrieves a list of files in a directory, optionally filtered by extension.
@@ -36,36 +527,38 @@ def get_files(
     Args:
         directory (Union[str, Path]): Path to the directory.
         recursive (bool, optional): Whether to search recursively or not. Defaults to True.
-        extension (Union[list[str], str, None], optional): File extension(including ".") to filter the files by. Defaults to None.
+        extension (Union[list[str], str, ExtensionFilter, None], optional): File extension(including ".") or ExtensionFilter to filter the files by. Defaults to None.
         include_directories (bool, optional): Whether to include directories in the list or not. Defaults to False.
+        sort (Union[str, bool], optional): One of "natural", "lexical", "none"(walk order), "mtime" and "size". True means "natural" and False means "none". Defaults to "natural".
+        workers (Optional[int], optional): Number of threads listing directories concurrently, which pays off on network filesystems. Defaults to None(serial).
 
     Returns:
         list: List of file paths.
     """
-    directory = Path(directory)
-
-    files = directory.glob(f"**/*" if recursive else "*")
-    files = list(
-        filter(lambda file: include_directories or file.is_file(), files)
-    )
-    if extension:
-        if isinstance(extension, str):
-            extension = [extension]
-        extension = [ext.lower() for ext in extension]
-
-        filtered_files = []
-        for file in files:
-            if file.suffix.lower() in extension or file.is_dir():
-                filtered_files.append(file)
-        files = filtered_files
-
-    return natsorted(set(files))
+    if workers:
+        files = _walk_parallel(
+            str(directory),
+            workers,
+            recursive=recursive,
+            directories=include_directories,
+            extension=_as_filter(extension),
+        )
+    else:
+        files = _walk(
+            str(directory),
+            recursive=recursive,
+            directories=include_directories,
+            extension=_as_filter(extension),
+        )
+    return list(map(Path, _sort_paths(files, sort)))
 
 
 def get_directories(
     directory: Union[str, Path],
     recursive: bool = True,
     only_empty: bool = False,
+    sort: Union[str, bool] = "natural",
+    workers: Optional[int] = None,
 ) -> list:
     """
     Retrieves a list of directories in a directory, optionally returns only empty directories.
@@ -74,27 +567,35 @@ def get_directories(
         directory (Union[str, Path]): Path to the directory.
         recursive (bool, optional): Whether to search recursively or not. Defaults to True.
         only_empty (bool, optional): Only empty directories are returned or not. Defaults to False.
+        sort (Union[str, bool], optional): One of "natural", "lexical", "none"(walk order), "mtime" and "size". True means "natural" and False means "none". Defaults to "natural".
+        workers (Optional[int], optional): Number of threads listing directories concurrently, which pays off on network filesystems. Defaults to None(serial).
 
     Returns:
         list: List of directory paths.
     """
-    directory = Path(directory)
-
-    files = directory.glob(f"**/*" if recursive else "*")
-    files = list(
-        filter(
-            lambda file: file.is_dir() and is_empty(file)
-            if only_empty
-            else file.is_dir(),
-            files,
+    if workers:
+        directories = _walk_parallel(
+            str(directory),
+            workers,
+            recursive=recursive,
+            files=False,
+            directories=True,
         )
-    )
+    else:
+        directories = _walk(
+            str(directory), recursive=recursive, files=False, directories=True
+        )
+    if only_empty:
+        directories = filter(is_empty, directories)
 
-    return natsorted(set(files))
+    return list(map(Path, _sort_paths(directories, sort)))
 
 
 def get_image_files(
-    directory: Union[str, Path], recursive: bool = True
+    directory: Union[str, Path],
+    recursive: bool = True,
+    sort: Union[str, bool] = "natural",
+    workers: Optional[int] = None,
 ) -> list:
     """
     Retrieves a list of all image files in a directory.
@@ -102,17 +603,26 @@ def get_image_files(
     Args:
         directory (Union[str, Path]): Path to the directory.
         recursive (bool, optional): Whether to search recursively or not. Defaults to True.
+        sort (Union[str, bool], optional): One of "natural", "lexical", "none"(walk order), "mtime" and "size". True means "natural" and False means "none". Defaults to "natural".
+        workers (Optional[int], optional): Number of threads listing directories concurrently. Defaults to None(serial).
 
     Returns:
         list: List of image file paths.
     """
     return get_files(
-        directory, recursive=recursive, extension=SUPPORTED_IMAGE_EXTENSIONS
+        directory,
+        recursive=recursive,
+        extension=IMAGE_EXTENSION_FILTER,
+        sort=sort,
+        workers=workers,
     )
 
 
 def get_video_files(
-    directory: Union[str, Path], recursive: bool = True
+    directory: Union[str, Path],
+    recursive: bool = True,
+    sort: Union[str, bool] = "natural",
+    workers: Optional[int] = None,
 ) -> list:
     """
     Retrieves a list of all video files in a directory.
@@ -120,10 +630,321 @@ def get_video_files(
     Args:
         directory (Union[str, Path]): Path to the directory.
         recursive (bool, optional): Whether to search recursively or not. Defaults to True.
+        sort (Union[str, bool], optional): One of "natural", "lexical", "none"(walk order), "mtime" and "size". True means "natural" and False means "none". Defaults to "natural".
+        workers (Optional[int], optional): Number of threads listing directories concurrently. Defaults to None(serial).
 
     Returns:
         list: List of video file paths.
     """
     return get_files(
-        directory, recursive=recursive, extension=SUPPORTED_VIDEO_EXTENSION
+        directory,
+        recursive=recursive,
+        extension=VIDEO_EXTENSION_FILTER,
+        sort=sort,
+        workers=workers,
     )
+
+
+@dataclass
+class IndexStats:
+    """Statistics of the last IndexedDirectory refresh."""
+
+    directories: int = 0
+    hits: int = 0
+    relisted: int = 0
+    files: int = 0
+
+
+class IndexedDirectory:
+    """Directory listing backed by a persistent SQLite index.
+
+    The index records the path, size and mtime of every entry and the mtime of every
+    directory. A refresh stats each directory once and re-lists only the directories
+    whose mtime changed since the last refresh, serving everything else from the index.
+
+    Directory mtimes only change when entries are added, removed or renamed, so a
+    file rewritten in place keeps its old size and mtime in the index until its
+    directory changes or the index is invalidated.
+
+    Example:
+        >>> with IndexedDirectory("dataset") as directory:
+        ...     images = directory.get_image_files()
+        ...     print(directory.stats)
+    """
+
+    # directory mtimes this close to the refresh may still change within the same tick
+    _MTIME_GRANULARITY_NS = 2_000_000_000
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        index_path: Union[str, Path] = None,
+    ):
+        """
+        Args:
+            directory (Union[str, Path]): Path to the directory.
+            index_path (Union[str, Path], optional): Path to the index file. Defaults to a file
+                under $XDG_CACHE_HOME/waffle_utils/index (~/.cache if unset) named after the directory.
+        """
+        self.directory = Path(directory).absolute()
+        if index_path is None:
+            cache_dir = Path(
+                os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache"),
+                "waffle_utils",
+                "index",
+            )
+            key = hashlib.sha1(str(self.directory).encode()).hexdigest()
+            index_path = cache_dir / f"{key}.sqlite"
+        self.index_path = Path(index_path).absolute()
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.stats = IndexStats()
+
+        self._connection = sqlite3.connect(self.index_path)
+        self._connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS directories (
+                path TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS entries (
+                directory TEXT NOT NULL,
+                name TEXT NOT NULL,
+                kind INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                PRIMARY KEY (directory, name)
+            );
+            """
+        )
+
+    def __enter__(self) -> "IndexedDirectory":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Close the index."""
+        self._connection.close()
+
+    def invalidate(self):
+        """Drop every record so the next refresh re-lists the whole directory."""
+        with self._connection:
+            self._connection.execute("DELETE FROM directories")
+            self._connection.execute("DELETE FROM entries")
+
+    def _remove_subtree(self, relative: str):
+        # every descendant path sorts between "relative/" and "relative0"
+        low, high = relative + os.sep, relative + chr(ord(os.sep) + 1)
+        for table, column in (
+            ("directories", "path"),
+            ("entries", "directory"),
+        ):
+            self._connection.execute(
+                f"DELETE FROM {table} WHERE {column} = ? OR ({column} >= ? AND {column} < ?)",
+                (relative, low, high),
+            )
+
+    def _list(self, relative: str) -> list[tuple]:
+        entries = []
+        try:
+            with os.scandir(os.path.join(self.directory, relative)) as it:
+                for entry in it:
+                    if entry.path == str(self.index_path):
+                        continue
+                    try:
+                        if entry.is_dir():
+                            kind = 2 if entry.is_symlink() else 1
+                            size = mtime_ns = 0
+                        elif entry.is_file():
+                            kind = 0
+                            stat = entry.stat()
+                            size, mtime_ns = stat.st_size, stat.st_mtime_ns
+                        else:
+                            continue
+                    except OSError:
+                        continue
+                    entries.append(
+                        (relative, entry.name, kind, size, mtime_ns)
+                    )
+        except OSError:
+            pass
+        return entries
+
+    def refresh(self, recursive: bool = True) -> IndexStats:
+        """
+        Bring the index up to date with the directory.
+
+        Args:
+            recursive (bool, optional): Whether to refresh subdirectories or not. Defaults to True.
+
+        Raises:
+            FileNotFoundError: if the directory does not exist.
+
+        Returns:
+            IndexStats: statistics of this refresh, also kept in the stats attribute.
+        """
+        if not self.directory.is_dir():
+            raise FileNotFoundError(f"{self.directory} does not exists")
+
+        stats = IndexStats()
+        unstable_after = time.time_ns() - self._MTIME_GRANULARITY_NS
+        known = dict(
+            self._connection.execute("SELECT path, mtime_ns FROM directories")
+        )
+
+        with self._connection:
+            stack = [""]
+            while stack:
+                relative = stack.pop()
+                stats.directories += 1
+                try:
+                    mtime_ns = os.stat(
+                        os.path.join(self.directory, relative)
+                    ).st_mtime_ns
+                except OSError:
+                    self._remove_subtree(relative)
+                    continue
+
+                if known.get(relative) == mtime_ns:
+                    stats.hits += 1
+                    entries = self._connection.execute(
+                        "SELECT directory, name, kind, size, mtime_ns FROM entries WHERE directory = ?",
+                        (relative,),
+                    ).fetchall()
+                else:
+                    stats.relisted += 1
+                    entries = self._list(relative)
+                    names = {entry[1] for entry in entries if entry[2] == 1}
+                    for (name,) in self._connection.execute(
+                        "SELECT name FROM entries WHERE directory = ? AND kind = 1",
+                        (relative,),
+                    ).fetchall():
+                        if name not in names:
+                            self._remove_subtree(os.path.join(relative, name))
+                    self._connection.execute(
+                        "DELETE FROM entries WHERE directory = ?", (relative,)
+                    )
+                    self._connection.executemany(
+                        "INSERT INTO entries VALUES (?, ?, ?, ?, ?)", entries
+                    )
+                    self._connection.execute(
+                        "INSERT OR REPLACE INTO directories VALUES (?, ?)",
+                        (
+                            relative,
+                            -1 if mtime_ns > unstable_after else mtime_ns,
+                        ),
+                    )
+
+                for _, name, kind, _, _ in entries:
+                    if kind == 0:
+                        stats.files += 1
+                    elif kind == 1 and recursive:
+                        stack.append(os.path.join(relative, name))
+
+        self.stats = stats
+        return stats
+
+    def iter_entries(
+        self,
+        recursive: bool = True,
+        extension: Union[list[str], str, ExtensionFilter, None] = None,
+    ) -> Iterator[tuple[Path, int, int]]:
+        """
+        Yields the indexed files with their size and mtime, without refreshing the index.
+
+        Args:
+            recursive (bool, optional): Whether to include subdirectories or not. Defaults to True.
+            extension (Union[list[str], str, ExtensionFilter, None], optional): File extension(including ".") or ExtensionFilter to filter the files by. Defaults to None.
+
+        Yields:
+            tuple[Path, int, int]: file path, size in bytes and mtime in nanoseconds.
+        """
+        extension = _as_filter(extension)
+        query = "SELECT directory, name, size, mtime_ns FROM entries WHERE kind = 0"
+        if not recursive:
+            query += " AND directory = ''"
+        for relative, name, size, mtime_ns in self._connection.execute(query):
+            if extension is None or extension(name):
+                yield Path(self.directory, relative, name), size, mtime_ns
+
+    def get_files(
+        self,
+        recursive: bool = True,
+        extension: Union[list[str], str, ExtensionFilter, None] = None,
+        include_directories: bool = False,
+        sort: Union[str, bool] = "natural",
+    ) -> list[Path]:
+        """
+        Refreshes the index and retrieves a list of files, optionally filtered by extension.
+
+        Args:
+            recursive (bool, optional): Whether to search recursively or not. Defaults to True.
+            extension (Union[list[str], str, ExtensionFilter, None], optional): File extension(including ".") or ExtensionFilter to filter the files by. Defaults to None.
+            include_directories (bool, optional): Whether to include directories in the list or not. Defaults to False.
+            sort (Union[str, bool], optional): One of "natural", "lexical", "none"(walk order), "mtime" and "size". True means "natural" and False means "none". Defaults to "natural".
+
+        Returns:
+            list: List of file paths.
+        """
+        self.refresh(recursive=recursive)
+
+        extension = _as_filter(extension)
+        query = "SELECT directory, name, kind, size, mtime_ns FROM entries"
+        if not recursive:
+            query += " WHERE directory = ''"
+
+        stats = {}
+        for relative, name, kind, size, mtime_ns in self._connection.execute(
+            query
+        ):
+            if kind:
+                if not include_directories:
+                    continue
+            elif extension is not None and not extension(name):
+                continue
+            stats[os.path.join(self.directory, relative, name)] = (
+                size,
+                mtime_ns,
+            )
+
+        return list(map(Path, _sort_paths(stats, sort, stats=stats)))
+
+    def get_image_files(
+        self, recursive: bool = True, sort: Union[str, bool] = "natural"
+    ) -> list[Path]:
+        """
+        Refreshes the index and retrieves a list of all image files.
+
+        Args:
+            recursive (bool, optional): Whether to search recursively or not. Defaults to True.
+            sort (Union[str, bool], optional): One of "natural", "lexical", "none"(walk order), "mtime" and "size". True means "natural" and False means "none". Defaults to "natural".
+
+        Returns:
+            list: List of image file paths.
+        """
+        return self.get_files(
+            recursive=recursive,
+            extension=IMAGE_EXTENSION_FILTER,
+            sort=sort,
+        )
+
+    def get_video_files(
+        self, recursive: bool = True, sort: Union[str, bool] = "natural"
+    ) -> list[Path]:
+        """
+        Refreshes the index and retrieves a list of all video files.
+
+        Args:
+            recursive (bool, optional): Whether to search recursively or not. Defaults to True.
+            sort (Union[str, bool], optional): One of "natural", "lexical", "none"(walk order), "mtime" and "size". True means "natural" and False means "none". Defaults to "natural".
+
+        Returns:
+            list: List of video file paths.
+        """
+        return self.get_files(
+            recursive=recursive,
+            extension=VIDEO_EXTENSION_FILTER,
+            sort=sort,
+        )
@@ -11,3 +11,6 @@ SUPPORTED_VIDEO_EXTENSION = [
     ".mpeg",
 ]
 DEFAULT_VIDEO_EXTENSION = SUPPORTED_VIDEO_EXTENSION[0]
+
+# formats whose data is already compressed, stored as is in archives
+COMPRESSED_EXTENSIONS = [".jpg", ".jpeg", ".png"] + SUPPORTED_VIDEO_EXTENSION